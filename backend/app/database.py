@@ -15,12 +15,56 @@ async def connect_to_mongo():
     global client, db
     client = AsyncIOMotorClient(MONGODB_URL)
     db = client[MONGODB_DB_NAME]
+    await ensure_indexes()
     print("Connected to MongoDB")
 
+async def ensure_indexes():
+    # 工具列表按 (created_at, _id) 倒序做游标分页，筛选字段放在前缀保证排序走索引
+    await db.tools.create_index([("is_active", 1), ("created_at", -1), ("_id", -1)])
+    await db.tools.create_index([("is_active", 1), ("category", 1), ("created_at", -1), ("_id", -1)])
+    await db.tools.create_index([("is_active", 1), ("is_featured", 1), ("created_at", -1), ("_id", -1)])
+    await db.tools.create_index([("is_active", 1), ("category", 1), ("is_featured", 1), ("created_at", -1), ("_id", -1)])
+    # 批量导入按 url upsert，唯一索引保证并发导入或与 create_tool 竞争时不会产生重复 url
+    await ensure_unique_url_index()
+    # sort_by=top_rated 按预先计算的贝叶斯平均分排序
+    await db.tools.create_index([("bayesian_rating", -1), ("_id", -1)])
+    # 评分统计按 tool_id 读写，全量重建时 $merge 也依赖该唯一索引
+    await db.rating_stats.create_index("tool_id", unique=True)
+    # 分享统计按 tool_id upsert，对账任务的 $merge 同样依赖该唯一索引
+    await db.share_stats.create_index("tool_id", unique=True)
+    # 分享/评分的小时、天汇总桶，写入按唯一键 upsert，趋势查询按 start 范围扫描
+    await db.stat_buckets.create_index([("tool_id", 1), ("metric", 1), ("granularity", 1), ("start", 1)], unique=True)
+    # 协同过滤近邻按 tool_id 批量读取
+    await db.tool_neighbors.create_index("tool_id", unique=True)
+
+async def ensure_unique_url_index():
+    info = await db.tools.index_information()
+    if info.get("url_1", {}).get("unique"):
+        return
+    duplicates = [
+        row["_id"] async for row in db.tools.aggregate([
+            {"$group": {"_id": "$url", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$limit": 10}
+        ], allowDiskUse=True)
+    ]
+    if duplicates:
+        # 已有重复 url 时建不了唯一索引，先保留普通索引；按 url 导入会更新其中任意一条，需人工合并后重启
+        print(f"tools.url has duplicates (e.g. {duplicates}), keeping the non-unique index until they are merged")
+        await db.tools.create_index("url")
+        return
+    if "url_1" in info:
+        await db.tools.drop_index("url_1")
+    await db.tools.create_index("url", unique=True)
+
 async def close_mongo_connection():
     if client:
         client.close()
         print("Closed MongoDB connection")
 
 def get_database():
-    return db 
\ No newline at end of file
+    return db
+
+def get_sync_database():
+    # 供命令行任务和基准脚本使用的同步连接
+    return MongoClient(MONGODB_URL)[MONGODB_DB_NAME] 
\ No newline at end of file
@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import auth, tools, categories, users, comments, favorites, ratings, tutorials, recommendations, statistics, search, compare, usage, category_management, system_config, tag, permission, version, log, subscription, share
-from app.database import connect_to_mongo, close_mongo_connection
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.counters import counter_buffer
+from app.services.rating_stats import backfill_bayesian_ratings
 
 app = FastAPI(title="AI Hub API", version="1.0.0")
 
@@ -41,9 +43,14 @@ app.include_router(share.router, prefix="/api", tags=["share"])
 @app.on_event("startup")
 async def startup_db_client():
     await connect_to_mongo()
+    await backfill_bayesian_ratings(get_database())
+    await tools.load_tool_indexes(get_database())
+    counter_buffer.start(get_database())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # 关闭连接前写回缓冲中的浏览/点赞计数
+    await counter_buffer.stop(get_database())
     await close_mongo_connection()
 
 @app.get("/")
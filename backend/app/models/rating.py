@@ -23,6 +23,7 @@ class RatingStats(BaseModel):
     tool_id: str
     average_score: float = 0
     total_ratings: int = 0
+    score_sum: float = 0
     score_distribution: dict = Field(default_factory=lambda: {
         "1": 0,
         "2": 0,
@@ -37,4 +38,7 @@ class RatingStats(BaseModel):
         json_encoders = {
             ObjectId: str,
             datetime: lambda dt: dt.isoformat()
-        } 
\ No newline at end of file
+        }
+
+class RatingStatsBatchRequest(BaseModel):
+    tool_ids: List[str]
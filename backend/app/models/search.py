@@ -1 +1,22 @@
- 
\ No newline at end of file
+from typing import Optional, List
+from pydantic import BaseModel, Field
+
+class SearchQuery(BaseModel):
+    keyword: Optional[str] = None
+    category_id: Optional[str] = None
+    tags: Optional[List[str]] = None
+    is_free: Optional[bool] = None
+    sort_by: Optional[str] = None  # 为空且有关键词时按相关度排序；top_rated 按贝叶斯平均分排序
+    sort_order: str = "desc"
+    page: int = Field(1, ge=1)
+    page_size: int = Field(10, ge=1, le=100)
+    facets: bool = False  # 同时返回分类、标签、免费/付费的分面计数
+    fields: Optional[str] = None  # 逗号分隔，只返回这些字段
+
+class SearchResult(BaseModel):
+    total: int
+    tools: List[dict]
+    page: int
+    page_size: int
+    total_pages: int
+    facets: Optional[dict] = None
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from pydantic import BaseModel, Field
 from bson import ObjectId
 
@@ -36,4 +36,25 @@ class UserStatistics(BaseModel):
         json_encoders = {
             ObjectId: str,
             datetime: lambda dt: dt.isoformat()
-        } 
\ No newline at end of file
+        }
+
+class StatBucket(BaseModel):
+    start: datetime
+    count: int = 0
+    score_sum: Optional[float] = None  # 仅评分桶
+    average_score: Optional[float] = None  # 仅评分桶
+    platforms: Optional[Dict[str, int]] = None  # 仅分享桶
+
+    class Config:
+        json_encoders = {
+            datetime: lambda dt: dt.isoformat()
+        }
+
+class StatTrend(BaseModel):
+    tool_id: str
+    metric: str
+    granularity: str
+    start: datetime
+    end: datetime
+    total: int = 0
+    buckets: List[StatBucket] = []
@@ -28,9 +28,47 @@ class ToolUpdate(ToolBase):
 
 class ToolInDB(ToolBase):
     id: str = Field(alias="_id")
+    bayesian_rating: float = 0.0  # 由评分统计维护，用于 top_rated 排序
     created_at: datetime
     updated_at: datetime
 
 class Tool(ToolInDB):
     class Config:
-        allow_population_by_field_name = True 
\ No newline at end of file
+        allow_population_by_field_name = True
+
+class ToolBatchRequest(BaseModel):
+    ids: List[str]
+
+class ToolBatchResult(BaseModel):
+    tools: List[Tool]
+    missing: List[str] = []
+
+# 列表接口 fields= 可选的字段
+TOOL_FIELDS = (
+    "name", "description", "url", "category", "subcategory", "tags", "icon", "is_free",
+    "is_featured", "rating", "views", "likes", "is_active", "created_at", "updated_at",
+    "bayesian_rating"
+)
+
+class ToolSlim(BaseModel):
+    """按 fields= 投影后的工具，除 id 外字段均可缺省"""
+    id: str = Field(alias="_id")
+    name: Optional[str] = None
+    description: Optional[str] = None
+    url: Optional[str] = None
+    category: Optional[str] = None
+    subcategory: Optional[str] = None
+    tags: Optional[List[str]] = None
+    icon: Optional[str] = None
+    is_free: Optional[bool] = None
+    is_featured: Optional[bool] = None
+    rating: Optional[float] = None
+    views: Optional[int] = None
+    likes: Optional[int] = None
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    bayesian_rating: Optional[float] = None
+
+    class Config:
+        allow_population_by_field_name = True
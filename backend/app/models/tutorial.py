@@ -17,4 +17,24 @@ class Tutorial(BaseModel):
         json_encoders = {
             ObjectId: str,
             datetime: lambda dt: dt.isoformat()
-        } 
\ No newline at end of file
+        }
+
+# 教程列表 fields= 可选的字段
+TUTORIAL_FIELDS = ("title", "content", "tool_id", "author_id", "steps", "created_at", "updated_at")
+
+class TutorialSlim(BaseModel):
+    """按 fields= 投影后的教程，除 id 外字段均可缺省"""
+    id: str = Field(alias="_id")
+    title: Optional[str] = None
+    content: Optional[str] = None
+    tool_id: Optional[str] = None
+    author_id: Optional[str] = None
+    steps: Optional[List[str]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        json_encoders = {
+            ObjectId: str,
+            datetime: lambda dt: dt.isoformat()
+        }
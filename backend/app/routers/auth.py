@@ -8,6 +8,7 @@ from pydantic import BaseModel
 import os
 from dotenv import load_dotenv
 from app.database import get_database
+from app.services.cache import TTLCache
 
 load_dotenv()
 
@@ -18,6 +19,12 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
+# 已认证用户的短期缓存，按用户名失效；修改、删除用户或修改密码后必须调用 invalidate_user
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", 4096)),
+    ttl=int(os.getenv("USER_CACHE_TTL", 60))
+)
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -56,6 +63,10 @@ async def authenticate_user(username: str, password: str):
         return False
     return user
 
+def invalidate_user(username: Optional[str]):
+    if username:
+        user_cache.pop(username)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -80,9 +91,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = await get_user(username=token_data.username)
+    # 登录校验密码时不走缓存，这里只缓存已存在的用户
+    user = user_cache.get(token_data.username)
     if user is None:
-        raise credentials_exception
+        user = await get_user(username=token_data.username)
+        if user is None:
+            raise credentials_exception
+        user_cache.set(token_data.username, user)
     return user
 
 @router.post("/token", response_model=Token)
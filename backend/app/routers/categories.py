@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from typing import List
 from pydantic import BaseModel
 from datetime import datetime
 from app.database import get_database
+from app.services.etag import make_etag, etag_matches, not_modified
 from bson import ObjectId
 
 router = APIRouter()
@@ -19,9 +20,14 @@ class CategoryInDB(Category):
     updated_at: datetime
 
 @router.get("/", response_model=List[CategoryInDB])
-async def get_categories():
+async def get_categories(request: Request, response: Response):
     db = get_database()
     categories = await db.categories.find({"is_active": True}).to_list(length=100)
+    
+    etag = make_etag(categories)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return categories
 
 @router.get("/{category_id}", response_model=CategoryInDB)
@@ -1,43 +1,283 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
-from app.models.tool import Tool, ToolCreate, ToolUpdate
+from app.models.tool import Tool, ToolCreate, ToolUpdate, ToolBatchRequest, ToolBatchResult, ToolSlim, TOOL_FIELDS
 from app.database import get_database
+from app.services.search_index import SearchIndex, search_index, normalize
+from app.services.autocomplete import AutocompleteIndex, autocomplete_index
+from app.services.bitmap_index import BitmapIndex, bitmap_index
+from app.services.similarity import ANN_ENABLED, SimilarityIndex, similarity_index
+from app.services.cache import TTLCache
+from app.services.etag import make_etag, etag_matches, not_modified
+from app.services.tool_import import import_tools, iter_lines
+from app.services.tool_export import export_ndjson, export_csv, gzip_stream
+from app.services.fields import parse_fields, projection, pick
+from app.services.counters import counter_buffer
+from app.services.rating_stats import load_prior_async
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
+import asyncio
+import base64
+import json
+import os
 
 router = APIRouter()
 
+# 工具详情与列表缓存，写操作时按受影响的条目精确失效
+TOOL_CACHE_TTL = int(os.getenv("TOOL_CACHE_TTL", 300))
+tool_cache = TTLCache(maxsize=int(os.getenv("TOOL_CACHE_SIZE", 2048)), ttl=TOOL_CACHE_TTL)
+list_cache = TTLCache(maxsize=int(os.getenv("TOOL_LIST_CACHE_SIZE", 512)), ttl=TOOL_CACHE_TTL)
+
+# 批量获取接口单次最多的 id 数
+MAX_BATCH_SIZE = 100
+
+def _invalidate_tool_cache(*tools: Optional[dict]):
+    """tools 为写操作前后的文档，只清除可能包含它们的列表缓存"""
+    tools = [tool for tool in tools if tool]
+    for tool in tools:
+        tool_cache.pop(str(tool["_id"]))
+    
+    def affected(key) -> bool:
+        params = dict(key)
+        if params["search"]:
+            return True
+        return any(
+            tool.get("is_active", True)
+            and params["category"] in (None, tool.get("category"))
+            and params["is_featured"] in (None, tool.get("is_featured", False))
+            for tool in tools
+        )
+    
+    list_cache.pop_where(affected)
+
+# 重建期间发生的增删改，重建完成后在新索引上重放
+_pending_index_ops: Optional[list] = None
+_rebuild_lock = asyncio.Lock()
+
+async def load_tool_indexes(db):
+    """在新实例上重建全部内存索引，完成后一次性换入，重建期间请求仍读取旧索引"""
+    global _pending_index_ops
+    async with _rebuild_lock:
+        _pending_index_ops = []
+        try:
+            fresh = [SearchIndex(), AutocompleteIndex(), BitmapIndex(), SimilarityIndex()]
+            for index in fresh:
+                await index.rebuild(db)
+            # TF-IDF 矩阵在线程中构建，不阻塞事件循环
+            if (refresh := fresh[3].schedule_refresh()):
+                await refresh
+            # 开启近似检索时以 mmap 方式挂接持久化的 LSH 索引，之后新增/删除的工具在内存中补齐
+            if ANN_ENABLED:
+                fresh[3].load_ann()
+            
+            # 以下到换入为止没有 await，不会有请求看到半成品
+            for op, arg in _pending_index_ops:
+                for index in fresh:
+                    getattr(index, op)(arg)
+            for live, index in zip((search_index, autocomplete_index, bitmap_index, similarity_index), fresh):
+                # 其他模块按名字导入了这些单例，替换其状态而不是重新绑定
+                live.__dict__ = index.__dict__
+            similarity_index.schedule_refresh()
+        finally:
+            _pending_index_ops = None
+
+def _index_tool(tool: dict):
+    search_index.add(tool)
+    autocomplete_index.add(tool)
+    bitmap_index.add(tool)
+    similarity_index.add(tool)
+    similarity_index.schedule_refresh()
+    if _pending_index_ops is not None:
+        _pending_index_ops.append(("add", tool))
+
+def _unindex_tool(tool_id: str):
+    search_index.remove(tool_id)
+    autocomplete_index.remove(tool_id)
+    bitmap_index.remove(tool_id)
+    similarity_index.remove(tool_id)
+    similarity_index.schedule_refresh()
+    if _pending_index_ops is not None:
+        _pending_index_ops.append(("remove", tool_id))
+
+async def find_tools_by_ids(db, tool_ids: List[str], fields: Optional[dict] = None) -> List[dict]:
+    # 一次 $in 查询取回，并按传入顺序返回
+    docs = {
+        str(tool["_id"]): tool
+        async for tool in db.tools.find({"_id": {"$in": [ObjectId(tool_id) for tool_id in tool_ids]}}, fields)
+    }
+    return [docs[tool_id] for tool_id in tool_ids if tool_id in docs]
+
+# 列表固定按 (created_at, _id) 倒序，游标记录上一页最后一条的排序键
+SORT_ORDER = [("created_at", -1), ("_id", -1)]
+
+def encode_cursor(tool: dict) -> str:
+    payload = json.dumps({"t": tool["created_at"].isoformat(), "id": str(tool["_id"])})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["t"]), ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def cursor_filter(created_at: datetime, last_id: ObjectId) -> dict:
+    # 严格位于上一页最后一条之后：created_at 更早，或 created_at 相同且 _id 更小
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": last_id}}
+    ]}
+
 @router.get("/", response_model=List[Tool])
 async def get_tools(
+    response: Response,
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = None,
     category: Optional[str] = None,
     search: Optional[str] = None,
-    is_featured: Optional[bool] = None
+    is_featured: Optional[bool] = None,
+    fields: Optional[str] = None
 ):
-    db = get_database()
-    query = {"is_active": True}
+    requested = parse_fields(fields, TOOL_FIELDS)
+    cache_key = tuple(sorted({
+        "skip": 0 if cursor else skip,
+        "limit": limit,
+        "cursor": cursor or None,
+        "category": category or None,
+        "search": normalize(search).strip() or None if search else None,
+        "is_featured": is_featured,
+        "fields": tuple(requested) if requested else None
+    }.items()))
+    if (cached := list_cache.get(cache_key)) is not None:
+        tools, next_cursor = cached
+    else:
+        # 游标需要 created_at，投影时总是一并取回
+        fields_projection = projection(requested, "created_at") if requested else None
+        tools = await _query_tools(get_database(), skip, limit, cursor, category, search, is_featured, fields_projection)
+        next_cursor = encode_cursor(tools[-1]) if tools and len(tools) == limit else None
+        if requested:
+            tools = [ToolSlim(**pick(tool, requested)).dict(by_alias=True, exclude_unset=True) for tool in tools]
+        list_cache.set(cache_key, (tools, next_cursor))
     
-    if category:
-        query["category"] = category
-    if is_featured is not None:
-        query["is_featured"] = is_featured
-    if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-            {"tags": {"$regex": search, "$options": "i"}}
-        ]
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if requested:
+        # 精简字段已按 ToolSlim 校验，不再经过完整的 Tool 响应模型
+        return JSONResponse(jsonable_encoder(tools), headers=headers)
+    response.headers.update(headers)
+    return tools
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    return {"detail": tool_cache.stats(), "list": list_cache.stats()}
+
+async def _query_tools(db, skip, limit, cursor, category, search, is_featured, fields=None) -> List[dict]:
+    last = decode_cursor(cursor) if cursor else None
+    search_ids = search_index.search_ids(search) if search else None
+    # 游标对应的工具仍在位图索引中时，序号更小的即为下一页
+    mask = bitmap_index.before(last[1]) if last else -1
     
-    tools = await db.tools.find(query).skip(skip).limit(limit).to_list(length=limit)
+    if mask is not None:
+        # 筛选在内存位图中完成，只有最终一页的 id 回表到 MongoDB
+        bits = bitmap_index.match(is_active=True, category=category or None, is_featured=is_featured) & mask
+        if search_ids is not None:
+            bits &= bitmap_index.ids_bitmap(search_ids)
+        page_ids = bitmap_index.select(bits, 0 if last else skip, limit)
+        tools = await find_tools_by_ids(db, page_ids, fields)
+    else:
+        # 游标对应的工具已被删除，按排序键查询
+        query = {"is_active": True}
+        if category:
+            query["category"] = category
+        if is_featured is not None:
+            query["is_featured"] = is_featured
+        if search_ids is not None:
+            query["_id"] = {"$in": [ObjectId(tool_id) for tool_id in search_ids]}
+        query = {"$and": [query, cursor_filter(*last)]}
+        tools = await db.tools.find(query, fields).sort(SORT_ORDER).limit(limit).to_list(length=limit)
     return tools
 
-@router.get("/{tool_id}", response_model=Tool)
-async def get_tool(tool_id: str):
+@router.post("/batch", response_model=ToolBatchResult)
+async def get_tools_batch(batch: ToolBatchRequest):
+    if len(batch.ids) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} ids per request")
+    
+    tool_ids = list(dict.fromkeys(batch.ids))
+    found = {}
+    to_fetch = []
+    for tool_id in tool_ids:
+        if (tool := tool_cache.get(tool_id)) is not None:
+            found[tool_id] = tool
+        elif ObjectId.is_valid(tool_id):
+            to_fetch.append(tool_id)
+    
+    # 缓存未命中的 id 合并成一次 $in 查询
+    if to_fetch:
+        for tool in await find_tools_by_ids(get_database(), to_fetch):
+            tool_id = str(tool["_id"])
+            tool_cache.set(tool_id, tool)
+            found[tool_id] = tool
+    
+    return {
+        "tools": [found[tool_id] for tool_id in tool_ids if tool_id in found],
+        "missing": [tool_id for tool_id in tool_ids if tool_id not in found]
+    }
+
+@router.post("/import")
+async def import_tools_ndjson(request: Request):
+    """以 NDJSON 请求体流式导入工具，按 url upsert，返回逐行错误"""
+    db = get_database()
+    report = await import_tools(db, iter_lines(request.stream()))
+    
+    # 批量写入后整体重建内存索引并清空缓存
+    await load_tool_indexes(db)
+    tool_cache.clear()
+    list_cache.clear()
+    return report
+
+@router.get("/export")
+async def export_tools(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False
+):
+    """流式导出全部工具，内存占用与集合大小无关"""
     db = get_database()
-    if (tool := await db.tools.find_one({"_id": ObjectId(tool_id)})) is not None:
-        return tool
-    raise HTTPException(status_code=404, detail="Tool not found")
+    if format == "csv":
+        body, media_type = export_csv(db), "text/csv; charset=utf-8"
+    else:
+        body, media_type = export_ndjson(db), "application/x-ndjson"
+    filename = f"tools.{format}"
+    if gzip:
+        body, media_type, filename = gzip_stream(body), "application/gzip", filename + ".gz"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/counters/stats")
+async def get_counter_stats():
+    return counter_buffer.stats()
+
+@router.get("/{tool_id}", response_model=Tool)
+async def get_tool(tool_id: str, request: Request, response: Response):
+    if (tool := tool_cache.get(tool_id)) is None:
+        db = get_database()
+        if (tool := await db.tools.find_one({"_id": ObjectId(tool_id)})) is None:
+            raise HTTPException(status_code=404, detail="Tool not found")
+        tool_cache.set(tool_id, tool)
+    
+    # 客户端已持有相同版本时直接返回 304，跳过序列化
+    etag = make_etag([tool])
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return tool
 
 @router.post("/", response_model=Tool)
 async def create_tool(tool: ToolCreate):
@@ -45,35 +285,71 @@ async def create_tool(tool: ToolCreate):
     tool_dict = tool.dict()
     tool_dict["created_at"] = datetime.utcnow()
     tool_dict["updated_at"] = datetime.utcnow()
+    # 还没有评分的工具按先验均值参与 bayesian_rating 排序
+    tool_dict["bayesian_rating"] = (await load_prior_async(db))["mean"]
     
-    result = await db.tools.insert_one(tool_dict)
+    try:
+        result = await db.tools.insert_one(tool_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Tool with this URL already exists")
     created_tool = await db.tools.find_one({"_id": result.inserted_id})
+    _index_tool(created_tool)
+    _invalidate_tool_cache(created_tool)
     return created_tool
 
+@router.get("/{tool_id}/similar", response_model=List[Tool])
+async def get_similar_tools(tool_id: str, limit: int = Query(10, ge=1, le=MAX_BATCH_SIZE)):
+    # 按 TF-IDF 余弦相似度降序，只回表取这一页
+    if tool_id not in similarity_index:
+        raise HTTPException(status_code=404, detail="Tool not found")
+    similar_ids = [similar_id for similar_id, _ in similarity_index.similar(tool_id, limit)]
+    return await find_tools_by_ids(get_database(), similar_ids)
+
+@router.post("/{tool_id}/view")
+async def record_view(tool_id: str):
+    # 只记入内存缓冲，由后台任务批量写回
+    if tool_id not in bitmap_index:
+        raise HTTPException(status_code=404, detail="Tool not found")
+    counter_buffer.incr(tool_id, "views")
+    return {"message": "View recorded"}
+
+@router.post("/{tool_id}/like")
+async def record_like(tool_id: str):
+    if tool_id not in bitmap_index:
+        raise HTTPException(status_code=404, detail="Tool not found")
+    counter_buffer.incr(tool_id, "likes")
+    return {"message": "Like recorded"}
+
 @router.put("/{tool_id}", response_model=Tool)
 async def update_tool(tool_id: str, tool: ToolUpdate):
     db = get_database()
     tool_dict = {k: v for k, v in tool.dict().items() if v is not None}
     tool_dict["updated_at"] = datetime.utcnow()
     
-    if len(tool_dict) >= 1:
-        update_result = await db.tools.update_one(
+    # 取回更新前的文档，用于判断哪些列表缓存需要失效
+    try:
+        old_tool = await db.tools.find_one_and_update(
             {"_id": ObjectId(tool_id)},
-            {"$set": tool_dict}
+            {"$set": tool_dict},
+            return_document=ReturnDocument.BEFORE
         )
-        
-        if update_result.modified_count == 0:
-            raise HTTPException(status_code=404, detail="Tool not found")
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Tool with this URL already exists")
+    if old_tool is None:
+        raise HTTPException(status_code=404, detail="Tool not found")
     
-    if (updated_tool := await db.tools.find_one({"_id": ObjectId(tool_id)})) is not None:
-        return updated_tool
-    raise HTTPException(status_code=404, detail="Tool not found")
+    updated_tool = {**old_tool, **tool_dict}
+    _index_tool(updated_tool)
+    _invalidate_tool_cache(old_tool, updated_tool)
+    return updated_tool
 
 @router.delete("/{tool_id}")
 async def delete_tool(tool_id: str):
     db = get_database()
-    delete_result = await db.tools.delete_one({"_id": ObjectId(tool_id)})
+    deleted_tool = await db.tools.find_one_and_delete({"_id": ObjectId(tool_id)})
     
-    if delete_result.deleted_count == 1:
+    if deleted_tool is not None:
+        _unindex_tool(tool_id)
+        _invalidate_tool_cache(deleted_tool)
         return {"message": "Tool deleted successfully"}
     raise HTTPException(status_code=404, detail="Tool not found") 
\ No newline at end of file
@@ -3,7 +3,7 @@ from typing import List
 from pydantic import BaseModel
 from datetime import datetime
 from app.database import get_database
-from app.routers.auth import get_current_user, User
+from app.routers.auth import get_current_user, invalidate_user, User
 from bson import ObjectId
 
 router = APIRouter()
@@ -44,14 +44,17 @@ async def update_user(user_id: str, user: UserUpdate, current_user: User = Depen
         raise HTTPException(status_code=404, detail="User not found")
     
     if (updated_user := await db.users.find_one({"_id": ObjectId(user_id)})) is not None:
+        invalidate_user(updated_user.get("username"))
         return updated_user
     raise HTTPException(status_code=404, detail="User not found")
 
 @router.delete("/{user_id}")
 async def delete_user(user_id: str, current_user: User = Depends(get_current_user)):
     db = get_database()
-    delete_result = await db.users.delete_one({"_id": ObjectId(user_id)})
+    # 取回被删除的文档，以便按用户名清除认证缓存
+    deleted_user = await db.users.find_one_and_delete({"_id": ObjectId(user_id)}, {"username": 1})
     
-    if delete_result.deleted_count == 1:
+    if deleted_user is not None:
+        invalidate_user(deleted_user.get("username"))
         return {"message": "User deleted successfully"}
     raise HTTPException(status_code=404, detail="User not found") 
\ No newline at end of file
@@ -1,14 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List
-from ..models.rating import Rating, RatingStats
+from ..models.rating import Rating, RatingStats, RatingStatsBatchRequest
 from ..models.user import User
 from ..auth import get_current_user
 from ..database import get_database
+from ..services.rating_stats import HAS_SCORE, aggregate_rating_stats, average_score_stage, set_bayesian_rating
+from ..services.rollups import record_rating
+from .recommendations import invalidate_recommendations
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter()
 
+# 批量获取评分统计单次最多的工具数
+MAX_STATS_BATCH_SIZE = 100
+
 @router.post("/tools/{tool_id}/ratings", response_model=Rating)
 async def create_rating(
     tool_id: str,
@@ -35,8 +43,10 @@ async def create_rating(
     result = db.ratings.insert_one(rating.dict(exclude={"id"}))
     rating.id = str(result.inserted_id)
     
-    # 更新评分统计
-    await update_rating_stats(tool_id, db)
+    # 更新评分统计与按小时/天的汇总
+    await apply_rating_delta(tool_id, db, new=rating.dict())
+    record_rating(db, tool_id, new=rating.dict())
+    invalidate_recommendations(current_user.id)
     
     return rating
 
@@ -106,8 +116,8 @@ async def update_rating(
     if existing_rating["user_id"] != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="无权修改此评分")
     
-    # 更新评分
-    rating_dict = rating.dict(exclude={"id"})
+    # 更新评分；归属与创建时间以库中记录为准，不随请求体覆盖
+    rating_dict = rating.dict(exclude={"id", "tool_id", "user_id", "created_at"})
     rating_dict["updated_at"] = datetime.utcnow()
     
     db.ratings.update_one(
@@ -115,10 +125,12 @@ async def update_rating(
         {"$set": rating_dict}
     )
     
-    # 更新评分统计
-    await update_rating_stats(tool_id, db)
+    # 更新评分统计与按小时/天的汇总
+    await apply_rating_delta(tool_id, db, old=existing_rating, new=rating_dict)
+    record_rating(db, tool_id, old=existing_rating, new=rating_dict)
+    invalidate_recommendations(existing_rating["user_id"])
     
-    return {**rating_dict, "id": rating_id}
+    return {**existing_rating, **rating_dict, "_id": rating_id}
 
 @router.delete("/tools/{tool_id}/ratings/{rating_id}")
 async def delete_rating(
@@ -147,8 +159,10 @@ async def delete_rating(
     # 删除评分
     db.ratings.delete_one({"_id": ObjectId(rating_id)})
     
-    # 更新评分统计
-    await update_rating_stats(tool_id, db)
+    # 更新评分统计与按小时/天的汇总
+    await apply_rating_delta(tool_id, db, old=rating)
+    record_rating(db, tool_id, old=rating)
+    invalidate_recommendations(rating["user_id"])
     
     return {"message": "评分已删除"}
 
@@ -169,13 +183,85 @@ async def get_rating_stats(
     
     return stats
 
+@router.post("/ratings/stats/batch", response_model=List[RatingStats])
+async def get_rating_stats_batch(
+    batch: RatingStatsBatchRequest,
+    db = Depends(get_database)
+):
+    """批量获取工具的评分统计，供列表页一次取回所有卡片的评分"""
+    if len(batch.tool_ids) > MAX_STATS_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"每次最多查询{MAX_STATS_BATCH_SIZE}个工具")
+    
+    tool_ids = list(dict.fromkeys(batch.tool_ids))
+    stats = {doc["tool_id"]: doc for doc in db.rating_stats.find({"tool_id": {"$in": tool_ids}})}
+    
+    # 缺少统计的工具在一次聚合中一并计算
+    missing = [tool_id for tool_id in tool_ids if tool_id not in stats]
+    if missing:
+        stats.update(aggregate_rating_stats(db, missing))
+    
+    return [stats[tool_id] for tool_id in tool_ids]
+
+def stat_key(tag: str) -> str:
+    # 标签作为 tag_stats 的字段名，不能包含 "." 或以 "$" 开头
+    return str(tag).replace(".", "．").lstrip("$")
+
+async def apply_rating_delta(
+    tool_id: str,
+    db,
+    old: Optional[dict] = None,
+    new: Optional[dict] = None
+):
+    """按一条评分的新增/修改/删除增量更新统计，操作次数与评分总数无关"""
+    inc = {}
+    
+    def add(rating: dict, sign: int):
+        # 旧版接口写入的评分没有 score，全量统计同样不计入
+        score = rating.get("score")
+        if not isinstance(score, (int, float)):
+            return
+        inc["score_sum"] = inc.get("score_sum", 0) + sign * score
+        inc["total_ratings"] = inc.get("total_ratings", 0) + sign
+        bucket = f"score_distribution.{int(score)}"
+        inc[bucket] = inc.get(bucket, 0) + sign
+        for tag in rating.get("tags", []):
+            key = f"tag_stats.{stat_key(tag)}"
+            inc[key] = inc.get(key, 0) + sign
+    
+    if old:
+        add(old, -1)
+    if new:
+        add(new, 1)
+    # version 每次变更加一，派生到 tools 上的贝叶斯平均分按版本号只进不退
+    inc = {k: v for k, v in inc.items() if v}
+    inc["version"] = 1
+    
+    stats = db.rating_stats.find_one_and_update(
+        {"tool_id": tool_id, "score_sum": {"$exists": True}},
+        {"$set": {"updated_at": datetime.utcnow()}, "$inc": inc},
+        return_document=ReturnDocument.AFTER
+    )
+    if stats is None:
+        # 还没有可增量维护的统计（新工具或旧版统计），全量计算一次，已包含本次变更
+        return await update_rating_stats(tool_id, db)
+    
+    # 平均分在数据库端按当前字段计算，并发写入时最后一次计算总是基于最新的累计值
+    stats = db.rating_stats.find_one_and_update(
+        {"tool_id": tool_id},
+        [average_score_stage()],
+        return_document=ReturnDocument.AFTER
+    )
+    set_bayesian_rating(db, tool_id, stats["score_sum"], stats.get("total_ratings", 0), stats["version"])
+    return RatingStats(**stats)
+
 async def update_rating_stats(tool_id: str, db) -> RatingStats:
     # 获取所有评分
-    ratings = list(db.ratings.find({"tool_id": tool_id}))
+    ratings = list(db.ratings.find({**HAS_SCORE, "tool_id": tool_id}))
     
     # 计算统计信息
     total_ratings = len(ratings)
     if total_ratings == 0:
+        total_score = 0
         average_score = 0
         score_distribution = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
         tag_stats = {}
@@ -194,21 +280,24 @@ async def update_rating_stats(tool_id: str, db) -> RatingStats:
         tag_stats = {}
         for rating in ratings:
             for tag in rating.get("tags", []):
-                tag_stats[tag] = tag_stats.get(tag, 0) + 1
+                tag_stats[stat_key(tag)] = tag_stats.get(stat_key(tag), 0) + 1
     
     # 创建或更新统计信息
     stats = RatingStats(
         tool_id=tool_id,
         average_score=average_score,
         total_ratings=total_ratings,
+        score_sum=total_score,
         score_distribution=score_distribution,
         tag_stats=tag_stats
     )
     
-    db.rating_stats.update_one(
+    stored = db.rating_stats.find_one_and_update(
         {"tool_id": tool_id},
-        {"$set": stats.dict(exclude={"id"})},
-        upsert=True
+        {"$set": stats.dict(exclude={"id"}), "$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    set_bayesian_rating(db, tool_id, total_score, total_ratings, stored["version"])
     
     return stats 
\ No newline at end of file
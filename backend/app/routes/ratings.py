@@ -4,6 +4,7 @@ from ..models.rating import Rating
 from ..models.user import User
 from ..auth import get_current_user
 from ..database import get_database
+from .recommendations import invalidate_recommendations
 from bson import ObjectId
 from datetime import datetime
 
@@ -72,5 +73,6 @@ async def rate_tool(
         },
         upsert=True
     )
+    invalidate_recommendations(current_user.id)
     
     return {"message": "评分成功"} 
\ No newline at end of file
@@ -4,74 +4,51 @@ from ..models.recommendation import Recommendation
 from ..models.user import User
 from ..auth import get_current_user
 from ..database import get_database
+from ..services.cache import TTLCache
+from ..services.item_cf import recommend_for_user
+from ..services.similarity import similarity_index
 from bson import ObjectId
+import os
 
 router = APIRouter()
 
+# 每个用户缓存一份排好序的推荐列表及其计算深度，按 limit 切片返回；用户收藏、评分或浏览后失效
+RECOMMENDATION_CACHE_DEPTH = 100
+recommendation_cache = TTLCache(
+    maxsize=int(os.getenv("RECOMMENDATION_CACHE_SIZE", 4096)),
+    ttl=int(os.getenv("RECOMMENDATION_CACHE_TTL", 600))
+)
+
+# 单个工具推荐时参与打分的内容相似工具数
+SIMILAR_CANDIDATES = 20
+
+def invalidate_recommendations(user_id: str):
+    """用户的行为发生变化（收藏、评分、浏览）后调用，下次请求时重新计算推荐"""
+    recommendation_cache.pop(str(user_id))
+
 @router.get("/recommendations", response_model=List[Recommendation])
 async def get_recommendations(
     current_user: User = Depends(get_current_user),
     db = Depends(get_database),
     limit: int = 10
 ):
-    # 获取用户的收藏工具
-    favorites = list(db.favorites.find({"user_id": str(current_user.id)}))
-    favorite_tool_ids = [favorite["tool_id"] for favorite in favorites]
-    
-    # 获取用户的评分工具
-    ratings = list(db.ratings.find({"user_id": str(current_user.id)}))
-    rated_tool_ids = [rating["tool_id"] for rating in ratings]
-    
-    # 获取用户浏览过的工具
-    viewed_tools = list(db.user_views.find({"user_id": str(current_user.id)}))
-    viewed_tool_ids = [view["tool_id"] for view in viewed_tools]
-    
-    # 获取所有相关工具
-    related_tools = []
+    user_id = str(current_user.id)
+    cached = recommendation_cache.get(user_id)
+    if cached is not None:
+        depth, cached_tools = cached
+        # 列表未取满说明候选已全部在内，否则 limit 超出缓存深度时需要重新计算
+        if limit <= depth or len(cached_tools) < depth:
+            return cached_tools[:limit]
     
-    # 基于收藏的工具推荐
-    for tool_id in favorite_tool_ids:
-        tool = db.tools.find_one({"_id": ObjectId(tool_id)})
-        if tool and tool.get("related_tools"):
-            related_tools.extend(tool["related_tools"])
-    
-    # 基于评分的工具推荐
-    for tool_id in rated_tool_ids:
-        tool = db.tools.find_one({"_id": ObjectId(tool_id)})
-        if tool and tool.get("related_tools"):
-            related_tools.extend(tool["related_tools"])
-    
-    # 基于浏览历史的工具推荐
-    for tool_id in viewed_tool_ids:
-        tool = db.tools.find_one({"_id": ObjectId(tool_id)})
-        if tool and tool.get("related_tools"):
-            related_tools.extend(tool["related_tools"])
-    
-    # 去重并计算推荐分数
-    tool_scores = {}
-    for tool in related_tools:
-        tool_id = str(tool["_id"])
-        if tool_id not in tool_scores:
-            tool_scores[tool_id] = 0
-        tool_scores[tool_id] += 1
-    
-    # 排除用户已经收藏、评分或浏览过的工具
-    excluded_tool_ids = set(favorite_tool_ids + rated_tool_ids + viewed_tool_ids)
+    depth = max(limit, RECOMMENDATION_CACHE_DEPTH)
+    scored = recommend_for_user(db, user_id, depth)
     recommended_tools = [
-        {
-            "user_id": str(current_user.id),
-            "tool_id": tool_id,
-            "score": score
-        }
-        for tool_id, score in tool_scores.items()
-        if tool_id not in excluded_tool_ids
+        Recommendation(user_id=user_id, tool_id=tool_id, score=score)
+        for tool_id, score in scored
     ]
+    recommendation_cache.set(user_id, (depth, recommended_tools))
     
-    # 按分数排序并限制数量
-    recommended_tools.sort(key=lambda x: x["score"], reverse=True)
-    recommended_tools = recommended_tools[:limit]
-    
-    return recommended_tools
+    return recommended_tools[:limit]
 
 @router.get("/tools/{tool_id}/recommendations", response_model=List[Recommendation])
 async def get_tool_recommendations(
@@ -85,36 +62,31 @@ async def get_tool_recommendations(
     if not tool:
         raise HTTPException(status_code=404, detail="工具未找到")
     
-    # 获取相关工具
-    related_tools = tool.get("related_tools", [])
+    # 候选工具：人工维护的相关工具基础分 1，内容相似的工具再加上余弦相似度
+    base_scores = {str(related_tool["_id"]): 1.0 for related_tool in tool.get("related_tools", [])}
+    for similar_id, similarity in similarity_index.similar(tool_id, SIMILAR_CANDIDATES):
+        base_scores[similar_id] = base_scores.get(similar_id, 0.0) + similarity
     
-    # 计算推荐分数
-    recommended_tools = []
-    for related_tool in related_tools:
-        # 计算相似度分数（这里简单使用1作为基础分数）
-        score = 1.0
-        
-        # 如果用户已经收藏过该工具，增加分数
-        favorite = db.favorites.find_one({
-            "user_id": str(current_user.id),
-            "tool_id": str(related_tool["_id"])
-        })
-        if favorite:
-            score += 0.5
-        
-        # 如果用户已经评分过该工具，增加分数
-        rating = db.ratings.find_one({
-            "user_id": str(current_user.id),
-            "tool_id": str(related_tool["_id"])
-        })
-        if rating:
-            score += 0.3
-        
-        recommended_tools.append({
-            "user_id": str(current_user.id),
-            "tool_id": str(related_tool["_id"]),
-            "score": score
-        })
+    # 用户收藏、评分过的工具各用一次查询取回，候选按集合成员加分
+    user_id = str(current_user.id)
+    candidate_ids = list(base_scores)
+    favorite_ids = {
+        favorite["tool_id"]
+        for favorite in db.favorites.find({"user_id": user_id, "tool_id": {"$in": candidate_ids}}, {"tool_id": 1})
+    }
+    rated_ids = {
+        rating["tool_id"]
+        for rating in db.ratings.find({"user_id": user_id, "tool_id": {"$in": candidate_ids}}, {"tool_id": 1})
+    }
+    
+    recommended_tools = [
+        {
+            "user_id": user_id,
+            "tool_id": candidate_id,
+            "score": score + (0.5 if candidate_id in favorite_ids else 0) + (0.3 if candidate_id in rated_ids else 0)
+        }
+        for candidate_id, score in base_scores.items()
+    ]
     
     # 按分数排序并限制数量
     recommended_tools.sort(key=lambda x: x["score"], reverse=True)
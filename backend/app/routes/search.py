@@ -1,52 +1,88 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List
 from ..models.search import SearchQuery, SearchResult
+from ..models.tool import TOOL_FIELDS
 from ..database import get_database
+from ..services.search_index import search_index
+from ..services.autocomplete import autocomplete_index
+from ..services.bitmap_index import bitmap_index
+from ..services.fields import parse_fields, projection
 from bson import ObjectId
 
 router = APIRouter()
 
+# 标签分面最多返回的条数
+FACET_TAG_LIMIT = 50
+
+# sort_by 别名到文档字段的映射
+SORT_FIELDS = {"top_rated": "bayesian_rating"}
+
+def format_facets(bits: int) -> dict:
+    is_free = bitmap_index.facet_counts(bits, "is_free")
+    return {
+        "category_id": bitmap_index.facet_counts(bits, "category_id"),
+        "tags": bitmap_index.facet_counts(bits, "tags", FACET_TAG_LIMIT),
+        "is_free": {"free": is_free.get(True, 0), "paid": is_free.get(False, 0)}
+    }
+
 @router.post("/search", response_model=SearchResult)
 async def search_tools(
     query: SearchQuery,
     db = Depends(get_database)
 ):
-    # 构建查询条件
-    search_filter = {}
-    
-    if query.keyword:
-        search_filter["$or"] = [
-            {"name": {"$regex": query.keyword, "$options": "i"}},
-            {"description": {"$regex": query.keyword, "$options": "i"}},
-            {"tags": {"$regex": query.keyword, "$options": "i"}}
-        ]
+    requested = parse_fields(query.fields, TOOL_FIELDS + ("category_id",))
+    fields_projection = projection(requested) if requested else None
     
-    if query.category_id:
-        search_filter["category_id"] = query.category_id
-    
-    if query.tags:
-        search_filter["tags"] = {"$all": query.tags}
-    
-    if query.is_free is not None:
-        search_filter["is_free"] = query.is_free
-    
-    # 构建排序条件
-    sort_field = query.sort_by or "created_at"
-    sort_order = -1 if query.sort_order == "desc" else 1
-    sort_condition = [(sort_field, sort_order)]
+    # 关键词在内存倒排索引中匹配，其余筛选条件在位图索引中求交
+    hits = search_index.search(query.keyword) if query.keyword else None
+    bits = bitmap_index.match(
+        category_id=query.category_id,
+        is_free=query.is_free,
+        tags=query.tags
+    )
+    if hits is not None:
+        bits &= bitmap_index.ids_bitmap(tool_id for tool_id, _ in hits)
+    total = bitmap_index.count(bits)
     
     # 计算分页
     skip = (query.page - 1) * query.page_size
     limit = query.page_size
     
-    # 执行查询
-    total = db.tools.count_documents(search_filter)
-    tools = list(
-        db.tools.find(search_filter)
-        .sort(sort_condition)
-        .skip(skip)
-        .limit(limit)
-    )
+    # 只有当前页的文档回表到 MongoDB
+    if hits is not None and not query.sort_by:
+        # 按相关度排序
+        page_ids = [tool_id for tool_id, _ in hits if bitmap_index.contains(bits, tool_id)][skip:skip + limit]
+    elif (query.sort_by or "created_at") == "created_at":
+        # 位图序号即创建时间顺序
+        page_ids = bitmap_index.select(bits, skip, limit, descending=query.sort_order == "desc")
+    else:
+        page_ids = None
+    
+    if page_ids is not None:
+        docs = {
+            str(tool["_id"]): tool
+            for tool in db.tools.find({"_id": {"$in": [ObjectId(tool_id) for tool_id in page_ids]}}, fields_projection)
+        }
+        tools = [docs[tool_id] for tool_id in page_ids if tool_id in docs]
+    else:
+        # 按其他字段排序时交给 MongoDB 排序分页
+        search_filter = {}
+        if hits is not None:
+            search_filter["_id"] = {"$in": [ObjectId(tool_id) for tool_id, _ in hits]}
+        if query.category_id:
+            search_filter["category_id"] = query.category_id
+        if query.tags:
+            search_filter["tags"] = {"$all": query.tags}
+        if query.is_free is not None:
+            search_filter["is_free"] = query.is_free
+        sort_field = SORT_FIELDS.get(query.sort_by, query.sort_by)
+        sort_order = -1 if query.sort_order == "desc" else 1
+        tools = list(
+            db.tools.find(search_filter, fields_projection)
+            .sort([(sort_field, sort_order), ("_id", sort_order)])
+            .skip(skip)
+            .limit(limit)
+        )
     
     # 计算总页数
     total_pages = (total + query.page_size - 1) // query.page_size
@@ -62,39 +98,14 @@ async def search_tools(
         "tools": tools,
         "page": query.page,
         "page_size": query.page_size,
-        "total_pages": total_pages
+        "total_pages": total_pages,
+        "facets": format_facets(bits) if query.facets else None
     }
 
 @router.get("/search/suggestions")
 async def get_search_suggestions(
     keyword: str,
-    db = Depends(get_database),
     limit: int = 5
 ):
-    # 搜索工具名称
-    tools = list(
-        db.tools.find(
-            {"name": {"$regex": keyword, "$options": "i"}},
-            {"name": 1, "_id": 1}
-        ).limit(limit)
-    )
-    
-    # 搜索标签
-    tags = list(
-        db.tools.aggregate([
-            {"$match": {"tags": {"$regex": keyword, "$options": "i"}}},
-            {"$unwind": "$tags"},
-            {"$match": {"tags": {"$regex": keyword, "$options": "i"}}},
-            {"$group": {"_id": "$tags"}},
-            {"$limit": limit}
-        ])
-    )
-    
-    # 转换ObjectId为字符串
-    for tool in tools:
-        tool["_id"] = str(tool["_id"])
-    
-    return {
-        "tools": [{"id": tool["_id"], "name": tool["name"]} for tool in tools],
-        "tags": [tag["_id"] for tag in tags]
-    } 
\ No newline at end of file
+    # 工具名称和标签的前缀建议直接由内存索引返回，不访问数据库
+    return autocomplete_index.suggest(keyword, limit)
\ No newline at end of file
@@ -4,6 +4,8 @@ from ..models.share import Share, ShareCreate, ShareStats
 from ..models.user import User
 from ..auth import get_current_user
 from ..database import get_database
+from ..services.share_stats import platform_key
+from ..services.rollups import record_share
 from bson import ObjectId
 from datetime import datetime
 
@@ -29,8 +31,9 @@ async def create_share(
     result = db.shares.insert_one(share_data)
     share_data["id"] = str(result.inserted_id)
     
-    # 更新分享统计
+    # 更新分享统计与按小时/天的汇总
     await update_share_stats(tool_id, share.platform, db)
+    record_share(db, tool_id, share.platform)
     
     return share_data
 
@@ -55,45 +58,26 @@ async def get_share_stats(
     """获取工具的分享统计"""
     stats = db.share_stats.find_one({"tool_id": tool_id})
     if not stats:
-        # 如果没有统计记录，创建一个新的
+        # 还没有分享记录，统计文档会在第一次分享时 upsert 创建
         stats = {
             "tool_id": tool_id,
             "total_shares": 0,
             "platform_stats": {}
         }
-        db.share_stats.insert_one(stats)
     
     return stats
 
 async def update_share_stats(tool_id: str, platform: str, db):
-    """更新分享统计"""
-    stats = db.share_stats.find_one({"tool_id": tool_id})
-    if not stats:
-        stats = {
-            "tool_id": tool_id,
-            "total_shares": 0,
-            "platform_stats": {}
-        }
-        db.share_stats.insert_one(stats)
-    
-    # 更新总分享数
-    total_shares = db.shares.count_documents({"tool_id": tool_id})
-    
-    # 更新平台统计
-    platform_stats = {}
-    for share in db.shares.find({"tool_id": tool_id}):
-        platform = share["platform"]
-        platform_stats[platform] = platform_stats.get(platform, 0) + 1
-    
+    """更新分享统计：一次 upsert 累加计数，不再扫描该工具的全部分享记录"""
+    now = datetime.utcnow()
     db.share_stats.update_one(
         {"tool_id": tool_id},
         {
-            "$set": {
-                "total_shares": total_shares,
-                "platform_stats": platform_stats,
-                "updated_at": datetime.utcnow()
-            }
-        }
+            "$inc": {"total_shares": 1, f"platform_stats.{platform_key(platform)}": 1},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"created_at": now}
+        },
+        upsert=True
     )
 
 @router.get("/users/shares", response_model=List[Share])
@@ -1 +1,55 @@
- 
\ No newline at end of file
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from ..models.statistics import StatTrend
+from ..database import get_database
+from ..services.rollups import METRICS, GRANULARITIES, MAX_BUCKETS, DAY, RATINGS, get_buckets
+from datetime import datetime, timezone
+
+router = APIRouter()
+
+# 未指定 start 时默认查询的桶数
+DEFAULT_BUCKETS = 7
+
+@router.get("/tools/{tool_id}/stats/{metric}/trend", response_model=StatTrend)
+async def get_stat_trend(
+    tool_id: str,
+    metric: str,
+    granularity: str = DAY,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db = Depends(get_database)
+):
+    """按小时或按天返回工具的分享/评分趋势，只读取区间内的汇总桶"""
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"metric 必须是 {', '.join(METRICS)} 之一")
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity 必须是 {', '.join(GRANULARITIES)} 之一")
+
+    # 库中时间均为 naive UTC，带时区的参数先换算成 UTC 再去掉时区
+    start, end = (
+        dt.astimezone(timezone.utc).replace(tzinfo=None) if dt and dt.tzinfo else dt
+        for dt in (start, end)
+    )
+    step = GRANULARITIES[granularity]
+    end = end or datetime.utcnow()
+    start = start or end - step * DEFAULT_BUCKETS
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start 必须早于 end")
+    if end - start > step * MAX_BUCKETS[granularity]:
+        raise HTTPException(status_code=400, detail=f"按{granularity}查询最多{MAX_BUCKETS[granularity]}个时间段")
+
+    buckets = get_buckets(db, tool_id, metric, granularity, start, end)
+    if metric == RATINGS:
+        for bucket in buckets:
+            count = bucket.get("count", 0)
+            bucket["average_score"] = round(bucket.get("score_sum", 0) / count, 2) if count else 0
+
+    return {
+        "tool_id": tool_id,
+        "metric": metric,
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "total": sum(bucket.get("count", 0) for bucket in buckets),
+        "buckets": buckets
+    }
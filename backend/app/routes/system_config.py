@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from typing import List, Any
 from ..models.system_config import SystemConfig
 from ..models.user import User
 from ..auth import get_current_user
 from ..database import get_database
+from ..services.etag import make_etag, etag_matches, not_modified
 from bson import ObjectId
 from datetime import datetime
 
@@ -31,6 +32,8 @@ async def create_config(
 
 @router.get("/configs", response_model=List[SystemConfig])
 async def get_configs(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db = Depends(get_database),
     skip: int = 0,
@@ -52,11 +55,18 @@ async def get_configs(
             .limit(limit)
         )
     
+    # 配置未变化时返回 304
+    etag = make_etag(configs)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return configs
 
 @router.get("/configs/{config_key}", response_model=SystemConfig)
 async def get_config(
     config_key: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db = Depends(get_database)
 ):
@@ -68,6 +78,10 @@ async def get_config(
     if not current_user.is_admin and not config.get("is_public", False):
         raise HTTPException(status_code=403, detail="无权访问此配置")
     
+    etag = make_etag([config])
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return config
 
 @router.put("/configs/{config_key}", response_model=SystemConfig)
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from typing import List
 from ..models.tag import Tag
 from ..models.user import User
 from ..auth import get_current_user
 from ..database import get_database
+from ..services.etag import make_etag, etag_matches, not_modified
 from bson import ObjectId
 from datetime import datetime
 
@@ -31,6 +32,8 @@ async def create_tag(
 
 @router.get("/tags", response_model=List[Tag])
 async def get_tags(
+    request: Request,
+    response: Response,
     db = Depends(get_database),
     skip: int = 0,
     limit: int = 100
@@ -42,6 +45,11 @@ async def get_tags(
         .limit(limit)
     )
     
+    # 标签未变化时返回 304
+    etag = make_etag(tags)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return tags
 
 @router.get("/tags/{tag_id}", response_model=Tag)
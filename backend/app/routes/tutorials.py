@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from ..models.tutorial import Tutorial
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from typing import List, Optional
+from ..models.tutorial import Tutorial, TutorialSlim, TUTORIAL_FIELDS
 from ..models.user import User
 from ..auth import get_current_user
 from ..database import get_database
+from ..services.fields import parse_fields, projection, pick
 from bson import ObjectId
 from datetime import datetime
 
@@ -12,8 +15,18 @@ router = APIRouter()
 @router.get("/tools/{tool_id}/tutorials", response_model=List[Tutorial])
 async def get_tool_tutorials(
     tool_id: str,
-    db = Depends(get_database)
+    db = Depends(get_database),
+    fields: Optional[str] = None
 ):
+    requested = parse_fields(fields, TUTORIAL_FIELDS)
+    if requested:
+        # 只取请求的字段，列表页通常不需要 content 正文
+        tutorials = db.tutorials.find({"tool_id": tool_id}, projection(requested))
+        return JSONResponse(jsonable_encoder([
+            TutorialSlim(**pick(tutorial, requested)).dict(by_alias=True, exclude_unset=True)
+            for tutorial in tutorials
+        ]))
+    
     tutorials = list(db.tutorials.find({"tool_id": tool_id}))
     return tutorials
 
@@ -0,0 +1,179 @@
+"""随机超平面 LSH 近似最近邻索引（余弦相似度）
+
+每个词项对应的随机超平面分量由词项的哈希决定，与词表顺序和大小无关，
+因此持久化的签名在词表增长后仍然有效，查询时只需为查询向量中出现的词项生成超平面。
+签名按表排序后保存为 .npy 文件，启动时以 mmap 方式加载，查询用 searchsorted 定位桶。
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+DEFAULT_TABLES = 16
+DEFAULT_BITS = 12
+# 对每张表额外探查汉明距离为 1 的相邻桶，提升召回
+DEFAULT_MULTIPROBE = True
+# 构建签名时每批投影的向量数，控制稠密中间矩阵的内存
+SIGNATURE_CHUNK_SIZE = 4096
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def _term_hashes(terms: Sequence[str], seed: int) -> np.ndarray:
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(term.encode(), digest_size=8, key=seed.to_bytes(8, "little")).digest(), "little")
+         for term in terms),
+        dtype=np.uint64,
+        count=len(terms)
+    )
+
+
+def hyperplanes(terms: Sequence[str], n_planes: int, seed: int = 0) -> np.ndarray:
+    """返回 (len(terms), n_planes) 的 ±1 矩阵，第 i 行只由 terms[i] 和 seed 决定（splitmix64）"""
+    with np.errstate(over="ignore"):
+        z = _term_hashes(terms, seed)[:, None] + np.arange(1, n_planes + 1, dtype=np.uint64) * _GOLDEN
+        z = (z ^ (z >> np.uint64(30))) * _MIX1
+        z = (z ^ (z >> np.uint64(27))) * _MIX2
+        z ^= z >> np.uint64(31)
+    return np.where(z >> np.uint64(63), 1.0, -1.0).astype(np.float32)
+
+
+def _pack(projected: np.ndarray, n_tables: int, n_bits: int) -> np.ndarray:
+    bits = (projected > 0).reshape(len(projected), n_tables, n_bits).astype(np.uint64)
+    return (bits << np.arange(n_bits, dtype=np.uint64)).sum(axis=2, dtype=np.uint64)
+
+
+def matrix_signatures(
+    vectors: sparse.csr_matrix,
+    terms: Sequence[str],
+    n_tables: int = DEFAULT_TABLES,
+    n_bits: int = DEFAULT_BITS,
+    seed: int = 0
+) -> np.ndarray:
+    """矩阵每一行（列对应 terms）的签名，形状 (行数, n_tables)"""
+    planes = hyperplanes(terms, n_tables * n_bits, seed)
+    signatures = np.empty((vectors.shape[0], n_tables), dtype=np.uint64)
+    for start in range(0, vectors.shape[0], SIGNATURE_CHUNK_SIZE):
+        projected = vectors[start:start + SIGNATURE_CHUNK_SIZE] @ planes
+        signatures[start:start + SIGNATURE_CHUNK_SIZE] = _pack(np.asarray(projected), n_tables, n_bits)
+    return signatures
+
+
+def vector_signature(
+    terms: Sequence[str],
+    weights: np.ndarray,
+    n_tables: int = DEFAULT_TABLES,
+    n_bits: int = DEFAULT_BITS,
+    seed: int = 0
+) -> np.ndarray:
+    """单个稀疏向量（词项及其权重）的签名，形状 (n_tables,)"""
+    if not len(terms):
+        return np.zeros(n_tables, dtype=np.uint64)
+    projected = np.asarray(weights, dtype=np.float32) @ hyperplanes(terms, n_tables * n_bits, seed)
+    return _pack(projected[None, :], n_tables, n_bits)[0]
+
+
+class LSHIndex:
+    """多表 LSH 索引：每张表按签名排序，同桶（及相邻桶）的条目作为候选，由调用方精排"""
+
+    def __init__(self, ids: np.ndarray, signatures: np.ndarray, n_bits: int = DEFAULT_BITS, seed: int = 0,
+                 order: Optional[np.ndarray] = None, sorted_signatures: Optional[np.ndarray] = None):
+        self.ids = ids
+        self.signatures = signatures
+        self.n_tables = signatures.shape[1]
+        self.n_bits = n_bits
+        self.seed = seed
+        if order is None:
+            order = np.argsort(signatures, axis=0, kind="stable").T.astype(np.int32)
+            sorted_signatures = np.take_along_axis(signatures.T, order, axis=1)
+        # order[t] 为第 t 张表中按签名升序的行号，sorted_signatures[t] 为对应签名
+        self.order = order
+        self.sorted_signatures = sorted_signatures
+        # 持久化之后新增的条目放在内存中线性比较，删除的条目记为墓碑
+        self.extra: Dict[str, np.ndarray] = {}
+        self.removed = set()
+
+    def __len__(self):
+        return len(self.ids) - len(self.removed) + len(self.extra)
+
+    def signature(self, terms: Sequence[str], weights: np.ndarray) -> np.ndarray:
+        return vector_signature(terms, weights, self.n_tables, self.n_bits, self.seed)
+
+    def add(self, item_id: str, signature: np.ndarray):
+        self.removed.add(item_id)
+        self.extra[item_id] = signature
+
+    def remove(self, item_id: str):
+        self.removed.add(item_id)
+        self.extra.pop(item_id, None)
+
+    def _probes(self, signature: np.ndarray, multiprobe: bool) -> np.ndarray:
+        if not multiprobe:
+            return signature[:, None]
+        flips = np.concatenate([[0], np.uint64(1) << np.arange(self.n_bits, dtype=np.uint64)]).astype(np.uint64)
+        return signature[:, None] ^ flips[None, :]
+
+    def candidate_rows(self, signature: np.ndarray, multiprobe: bool = DEFAULT_MULTIPROBE) -> np.ndarray:
+        """持久化部分中与签名同桶的行号（未去掉墓碑），已去重"""
+        probes = self._probes(signature, multiprobe)
+        rows = []
+        for table in range(self.n_tables):
+            column = self.sorted_signatures[table]
+            lo = np.searchsorted(column, probes[table], side="left")
+            hi = np.searchsorted(column, probes[table], side="right")
+            for start, end in zip(lo.tolist(), hi.tolist()):
+                if end > start:
+                    rows.append(self.order[table, start:end])
+        return np.unique(np.concatenate(rows)) if rows else np.empty(0, dtype=np.int32)
+
+    def candidate_extras(self, signature: np.ndarray, multiprobe: bool = DEFAULT_MULTIPROBE) -> List[str]:
+        """持久化之后新增的条目中与签名同桶的 id"""
+        found = []
+        for item_id, item_signature in self.extra.items():
+            diff = item_signature ^ signature
+            # 任一表签名相同，或开启多探查时只差一位
+            match = (diff & (diff - np.uint64(1))) == 0 if multiprobe else diff == 0
+            if match.any():
+                found.append(item_id)
+        return found
+
+    def candidates(self, signature: np.ndarray, multiprobe: bool = DEFAULT_MULTIPROBE) -> List[str]:
+        found = [
+            item_id for item_id in self.ids[self.candidate_rows(signature, multiprobe)].tolist()
+            if item_id not in self.removed
+        ]
+        return found + self.candidate_extras(signature, multiprobe)
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "ids.npy"), np.asarray(self.ids, dtype=str))
+        np.save(os.path.join(path, "signatures.npy"), np.asarray(self.signatures))
+        np.save(os.path.join(path, "order.npy"), np.asarray(self.order))
+        np.save(os.path.join(path, "sorted_signatures.npy"), np.asarray(self.sorted_signatures))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"n_tables": self.n_tables, "n_bits": self.n_bits, "seed": self.seed}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "LSHIndex":
+        """以 mmap 方式打开持久化的索引，数组按需从磁盘分页读入"""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+
+        def array(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        return cls(
+            array("ids"), array("signatures"), meta["n_bits"], meta["seed"],
+            order=array("order"), sorted_signatures=array("sorted_signatures")
+        )
+
+    @classmethod
+    def build(cls, ids: Iterable[str], vectors: sparse.csr_matrix, terms: Sequence[str],
+              n_tables: int = DEFAULT_TABLES, n_bits: int = DEFAULT_BITS, seed: int = 0) -> "LSHIndex":
+        signatures = matrix_signatures(vectors, terms, n_tables, n_bits, seed)
+        return cls(np.asarray(list(ids), dtype=str), signatures, n_bits, seed)
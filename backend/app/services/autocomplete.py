@@ -0,0 +1,141 @@
+import bisect
+import heapq
+import unicodedata
+from typing import Dict, List, Tuple
+
+from .search_index import CJK_RE, normalize
+
+# 前缀查询结果缓存的最大条数，索引变化时整体清空
+MAX_CACHED_PREFIXES = 1024
+
+TOOL = "tool"
+TAG = "tag"
+
+
+def _entry_keys(text: str) -> List[str]:
+    """名称的可匹配起点：整串、每个单词开头、驼峰词的每段开头（ChatGPT 的 GPT）、每个汉字位置"""
+    # 先按原大小写找驼峰边界，再逐个小写化
+    text = unicodedata.normalize("NFKC", text or "").strip()
+    keys = []
+    for i, char in enumerate(text):
+        if not char.isalnum():
+            continue
+        prev = text[i - 1] if i else ""
+        if (
+            i == 0
+            or CJK_RE.match(char)
+            or not prev.isalnum()
+            or (char.isupper() and prev.islower())
+            or (char.isupper() and prev.isupper() and text[i + 1:i + 2].islower())
+        ):
+            keys.append(normalize(text[i:]))
+    return keys
+
+
+class AutocompleteIndex:
+    """工具名称与标签的前缀索引（有序数组 + 二分），按热度返回前 k 个建议"""
+
+    def __init__(self):
+        # (key, kind, ref) 有序数组，ref 为工具 id 或标签名
+        self.entries: List[Tuple[str, str, str]] = []
+        self.tool_names: Dict[str, str] = {}
+        self.tool_tags: Dict[str, List[str]] = {}
+        self.tool_weights: Dict[str, int] = {}
+        self.tag_counts: Dict[str, int] = {}
+        self._cache: Dict[Tuple[str, int], dict] = {}
+
+    def clear(self):
+        self.__init__()
+
+    def _insert(self, key: str, kind: str, ref: str):
+        entry = (key, kind, ref)
+        i = bisect.bisect_left(self.entries, entry)
+        if i == len(self.entries) or self.entries[i] != entry:
+            self.entries.insert(i, entry)
+
+    def _delete(self, key: str, kind: str, ref: str):
+        entry = (key, kind, ref)
+        i = bisect.bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry:
+            del self.entries[i]
+
+    def add(self, tool: dict):
+        tool_id = str(tool["_id"])
+        if tool_id in self.tool_names:
+            self.remove(tool_id)
+
+        name = tool.get("name") or ""
+        tags = list(dict.fromkeys(tool.get("tags") or []))
+        self.tool_names[tool_id] = name
+        self.tool_tags[tool_id] = tags
+        self.tool_weights[tool_id] = (tool.get("views") or 0) + (tool.get("likes") or 0)
+        for key in _entry_keys(name):
+            self._insert(key, TOOL, tool_id)
+
+        for tag in tags:
+            count = self.tag_counts.get(tag, 0)
+            if count == 0:
+                for key in _entry_keys(tag):
+                    self._insert(key, TAG, tag)
+            self.tag_counts[tag] = count + 1
+        self._cache.clear()
+
+    def remove(self, tool_id: str):
+        tool_id = str(tool_id)
+        name = self.tool_names.pop(tool_id, None)
+        if name is None:
+            return
+        self.tool_weights.pop(tool_id, None)
+        for key in _entry_keys(name):
+            self._delete(key, TOOL, tool_id)
+
+        for tag in self.tool_tags.pop(tool_id, []):
+            count = self.tag_counts.get(tag, 0) - 1
+            if count <= 0:
+                self.tag_counts.pop(tag, None)
+                for key in _entry_keys(tag):
+                    self._delete(key, TAG, tag)
+            else:
+                self.tag_counts[tag] = count
+        self._cache.clear()
+
+    def add_weights(self, increments: Dict[str, int]):
+        """浏览/点赞计数写回数据库后同步累加热度，未索引的工具忽略"""
+        for tool_id, amount in increments.items():
+            if tool_id in self.tool_weights:
+                self.tool_weights[tool_id] += amount
+        self._cache.clear()
+
+    async def rebuild(self, db):
+        self.clear()
+        async for tool in db.tools.find({}, {"name": 1, "tags": 1, "views": 1, "likes": 1}):
+            self.add(tool)
+
+    def suggest(self, prefix: str, limit: int = 5) -> dict:
+        prefix = normalize(prefix).strip()
+        cache_key = (prefix, limit)
+        if (cached := self._cache.get(cache_key)) is not None:
+            return cached
+
+        tool_ids = set()
+        tags = set()
+        if prefix:
+            start = bisect.bisect_left(self.entries, (prefix,))
+            end = bisect.bisect_left(self.entries, (prefix + "\uffff",), lo=start)
+            for _, kind, ref in self.entries[start:end]:
+                (tool_ids if kind == TOOL else tags).add(ref)
+
+        top_tools = heapq.nlargest(limit, tool_ids, key=lambda t: (self.tool_weights[t], t))
+        top_tags = heapq.nlargest(limit, tags, key=lambda t: (self.tag_counts[t], t))
+        result = {
+            "tools": [{"id": tool_id, "name": self.tool_names[tool_id]} for tool_id in top_tools],
+            "tags": top_tags
+        }
+
+        if len(self._cache) >= MAX_CACHED_PREFIXES:
+            self._cache.clear()
+        self._cache[cache_key] = result
+        return result
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,193 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+# 参与筛选的工具属性及缺省值（与 ToolBase 默认值一致）
+FIELDS = {
+    "category": None,
+    "category_id": None,
+    "subcategory": None,
+    "tags": None,
+    "is_free": True,
+    "is_featured": False,
+    "is_active": True
+}
+
+WORD_BITS = 64
+WORD_BYTES = WORD_BITS // 8
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(bits: int) -> int:
+        return bin(bits).count("1")
+
+
+def _values(tool: dict, field: str) -> list:
+    value = tool.get(field, FIELDS[field])
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return list(dict.fromkeys(str(v) for v in value))
+    if isinstance(value, bool):
+        return [value]
+    return [str(value)]
+
+
+class BitmapIndex:
+    """工具属性的位图索引
+
+    每个工具分配一个序号，每个属性值对应一个以 Python 整数表示的位图，
+    筛选条件变成位图的与/或运算，只有最终一页的 id 才回表到 MongoDB。
+    全量构建时按 (created_at, _id) 升序分配序号，新工具追加在末尾，
+    因此序号顺序即列表的默认排序。
+    """
+
+    def __init__(self):
+        self.ids: List[Optional[str]] = []
+        self.ordinals: Dict[str, int] = {}
+        self.live = 0
+        self.bitmaps: Dict[str, Dict[Any, int]] = {field: {} for field in FIELDS}
+        self.doc_values: Dict[int, Dict[str, list]] = {}
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def __contains__(self, tool_id: str) -> bool:
+        return str(tool_id) in self.ordinals
+
+    def clear(self):
+        self.__init__()
+
+    def _set(self, ordinal: int, values: Dict[str, list]):
+        bit = 1 << ordinal
+        for field, field_values in values.items():
+            bitmaps = self.bitmaps[field]
+            for value in field_values:
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+        self.live |= bit
+        self.doc_values[ordinal] = values
+
+    def _unset(self, ordinal: int):
+        mask = ~(1 << ordinal)
+        for field, field_values in self.doc_values.pop(ordinal, {}).items():
+            bitmaps = self.bitmaps[field]
+            for value in field_values:
+                bits = bitmaps[value] & mask
+                if bits:
+                    bitmaps[value] = bits
+                else:
+                    del bitmaps[value]
+        self.live &= mask
+
+    def add(self, tool: dict):
+        tool_id = str(tool["_id"])
+        values = {field: _values(tool, field) for field in FIELDS}
+        ordinal = self.ordinals.get(tool_id)
+        if ordinal is None:
+            ordinal = len(self.ids)
+            self.ids.append(tool_id)
+            self.ordinals[tool_id] = ordinal
+        else:
+            self._unset(ordinal)
+        self._set(ordinal, values)
+
+    def remove(self, tool_id: str):
+        ordinal = self.ordinals.pop(str(tool_id), None)
+        if ordinal is None:
+            return
+        self._unset(ordinal)
+        # 序号不复用，保证新工具始终排在最后
+        self.ids[ordinal] = None
+
+    async def rebuild(self, db):
+        self.clear()
+        projection = {field: 1 for field in FIELDS}
+        cursor = db.tools.find({}, projection).sort([("created_at", 1), ("_id", 1)])
+        async for tool in cursor:
+            self.add(tool)
+
+    def bitmap(self, field: str, value: Any) -> int:
+        if not isinstance(value, bool):
+            value = str(value)
+        return self.bitmaps[field].get(value, 0)
+
+    def ids_bitmap(self, tool_ids: Iterable[str]) -> int:
+        bits = 0
+        for tool_id in tool_ids:
+            ordinal = self.ordinals.get(str(tool_id))
+            if ordinal is not None:
+                bits |= 1 << ordinal
+        return bits
+
+    def match(self, tags: Optional[List[str]] = None, **equals) -> int:
+        """按属性值做与运算；tags 要求同时包含全部标签，值为 None 的条件忽略"""
+        bits = self.live
+        for field, value in equals.items():
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                any_bits = 0
+                for v in value:
+                    any_bits |= self.bitmap(field, v)
+                bits &= any_bits
+            else:
+                bits &= self.bitmap(field, value)
+        for tag in tags or []:
+            bits &= self.bitmap("tags", tag)
+        return bits
+
+    def before(self, tool_id: str) -> Optional[int]:
+        """排在 tool_id 之前（序号更小）的掩码，tool_id 不在索引中时返回 None"""
+        ordinal = self.ordinals.get(str(tool_id))
+        if ordinal is None:
+            return None
+        return (1 << ordinal) - 1
+
+    def after(self, tool_id: str) -> Optional[int]:
+        ordinal = self.ordinals.get(str(tool_id))
+        if ordinal is None:
+            return None
+        return self.live & ~((1 << (ordinal + 1)) - 1)
+
+    def contains(self, bits: int, tool_id: str) -> bool:
+        ordinal = self.ordinals.get(str(tool_id))
+        return ordinal is not None and bool(bits >> ordinal & 1)
+
+    def select(self, bits: int, skip: int = 0, limit: int = 10, descending: bool = True) -> List[str]:
+        """按序号顺序跳过 skip 个后取 limit 个 tool_id，按 64 位字整体跳过"""
+        if not bits or limit <= 0:
+            return []
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        n_words = (len(data) + WORD_BYTES - 1) // WORD_BYTES
+        words = range(n_words - 1, -1, -1) if descending else range(n_words)
+        result = []
+        for w in words:
+            word = int.from_bytes(data[w * WORD_BYTES:(w + 1) * WORD_BYTES], "little")
+            if not word:
+                continue
+            count = popcount(word)
+            if skip >= count:
+                skip -= count
+                continue
+            positions = [i for i in range(WORD_BITS) if word >> i & 1]
+            if descending:
+                positions.reverse()
+            for i in positions[skip:]:
+                result.append(self.ids[w * WORD_BITS + i])
+                if len(result) == limit:
+                    return result
+            skip = 0
+        return result
+
+    def count(self, bits: int) -> int:
+        return popcount(bits)
+
+    def facet_counts(self, bits: int, field: str, limit: Optional[int] = None) -> Dict[Any, int]:
+        counts = {}
+        for value, value_bits in self.bitmaps[field].items():
+            if (n := popcount(bits & value_bits)):
+                counts[value] = n
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+        return dict(ranked[:limit] if limit else ranked)
+
+
+bitmap_index = BitmapIndex()
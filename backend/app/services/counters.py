@@ -0,0 +1,94 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.services.autocomplete import autocomplete_index
+
+COUNTER_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", 5))
+
+
+class CounterBuffer:
+    """在内存中累加工具的浏览/点赞增量，定期合并成一次 bulk_write 写回
+
+    进程正常退出时在 shutdown 事件里做最后一次写回；异常退出会丢失未写回的增量。
+    """
+
+    def __init__(self, fields=("views", "likes")):
+        self.fields = fields
+        self.pending: Dict[str, Dict[str, int]] = {}
+        self.flushes = 0
+        self.flushed_increments = 0
+        self.last_flush_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def incr(self, tool_id: str, field: str, amount: int = 1):
+        if field not in self.fields:
+            raise ValueError(f"Unknown counter field: {field}")
+        counters = self.pending.setdefault(str(tool_id), {})
+        counters[field] = counters.get(field, 0) + amount
+
+    @property
+    def depth(self) -> int:
+        return len(self.pending)
+
+    def stats(self) -> dict:
+        return {
+            "pending_tools": self.depth,
+            "pending_increments": sum(sum(c.values()) for c in self.pending.values()),
+            "flushes": self.flushes,
+            "flushed_increments": self.flushed_increments,
+            "last_flush_at": self.last_flush_at,
+            "flush_interval": COUNTER_FLUSH_INTERVAL
+        }
+
+    async def flush(self, db) -> int:
+        if not self.pending:
+            return 0
+        pending, self.pending = self.pending, {}
+        ops = [
+            UpdateOne({"_id": ObjectId(tool_id)}, {"$inc": counters})
+            for tool_id, counters in pending.items()
+        ]
+        try:
+            await db.tools.bulk_write(ops, ordered=False)
+        except Exception:
+            # 写回失败时把增量放回队列，下次重试
+            for tool_id, counters in pending.items():
+                for field, amount in counters.items():
+                    self.incr(tool_id, field, amount)
+            raise
+        # 自动补全按 views + likes 排序，写回成功后同步更新，不必等到重建索引
+        autocomplete_index.add_weights({tool_id: sum(counters.values()) for tool_id, counters in pending.items()})
+        self.flushes += 1
+        self.flushed_increments += sum(sum(c.values()) for c in pending.values())
+        self.last_flush_at = datetime.utcnow()
+        return len(ops)
+
+    async def _run(self, db, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush(db)
+            except Exception as exc:
+                print(f"Counter flush failed: {exc}")
+
+    def start(self, db, interval: float = COUNTER_FLUSH_INTERVAL):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db, interval))
+
+    async def stop(self, db):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(db)
+
+
+counter_buffer = CounterBuffer()
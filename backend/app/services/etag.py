@@ -0,0 +1,25 @@
+import hashlib
+from typing import Iterable, Optional
+
+import bson
+from fastapi import Response
+
+
+def make_etag(docs: Iterable[dict]) -> str:
+    """按文档的 BSON 内容计算强 ETag，文档任何字段变化都会改变 ETag"""
+    digest = hashlib.sha1()
+    for doc in docs:
+        digest.update(bson.encode(doc))
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match 使用弱比较：忽略 W/ 前缀，只比较引号内的值
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,23 @@
+from typing import Iterable, List, Optional
+
+from fastapi import HTTPException
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """解析逗号分隔的 fields= 参数，未指定时返回 None 表示返回完整文档"""
+    if not fields:
+        return None
+    requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+def projection(fields: List[str], *extra: str) -> dict:
+    return {field: 1 for field in [*fields, *extra]}
+
+
+def pick(doc: dict, fields: List[str]) -> dict:
+    """只保留请求的字段，_id 转为字符串"""
+    return {"_id": str(doc["_id"]), **{field: doc[field] for field in fields if field in doc}}
@@ -0,0 +1,198 @@
+"""基于物品的协同过滤（离线计算）
+
+从 favorites、ratings、user_views 构建 用户×工具 稀疏交互矩阵，按列做 L2 归一化后计算工具间余弦相似度，
+每个工具保留前 K 个近邻写入 tool_neighbors。作为命令行或定时任务运行（在 backend 目录下）：
+    python -m app.services.item_cf --top-k 50
+"""
+import argparse
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from bson import ObjectId
+from pymongo import ReplaceOne
+from scipy import sparse
+
+from app.database import get_sync_database
+
+# 各类交互的权重，评分再乘以 score / 5
+INTERACTION_WEIGHTS = {"favorites": 1.0, "ratings": 1.0, "user_views": 0.3}
+TOP_K = 50
+# 每批计算相似度的工具数，控制中间矩阵的内存
+SIMILARITY_CHUNK_SIZE = 1000
+# 相似度低于该值的近邻不保存
+MIN_SIMILARITY = 0.01
+
+
+def _interactions(db) -> Tuple[List[str], List[str], np.ndarray]:
+    users: List[str] = []
+    tools: List[str] = []
+    weights: List[float] = []
+    for collection, weight in INTERACTION_WEIGHTS.items():
+        projection = {"_id": 0, "user_id": 1, "tool_id": 1}
+        if collection == "ratings":
+            projection["score"] = 1
+        for doc in db[collection].find({"user_id": {"$ne": None}, "tool_id": {"$ne": None}}, projection):
+            users.append(str(doc["user_id"]))
+            tools.append(str(doc["tool_id"]))
+            weights.append(weight * doc.get("score", 5) / 5 if collection == "ratings" else weight)
+    return users, tools, np.asarray(weights, dtype=np.float64)
+
+
+def build_interaction_matrix(db) -> Tuple[sparse.csc_matrix, np.ndarray]:
+    """返回按列 L2 归一化的 用户×工具 矩阵及列对应的 tool_id；同一用户对同一工具的多次交互权重相加"""
+    users, tools, weights = _interactions(db)
+    user_ids, user_index = np.unique(np.asarray(users, dtype=object), return_inverse=True)
+    tool_ids, tool_index = np.unique(np.asarray(tools, dtype=object), return_inverse=True)
+    matrix = sparse.coo_matrix(
+        (weights, (user_index, tool_index)), shape=(len(user_ids), len(tool_ids))
+    ).tocsc()
+    matrix.sum_duplicates()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    return (matrix @ sparse.diags(1.0 / norms)).tocsc(), tool_ids
+
+
+def top_k_neighbors(matrix: sparse.csc_matrix, top_k: int = TOP_K, chunk_size: int = SIMILARITY_CHUNK_SIZE):
+    """逐批计算 工具×工具 余弦相似度，产出 (列号, 近邻列号数组, 相似度数组)，近邻按相似度降序"""
+    transposed = matrix.T.tocsr()
+    n_tools = matrix.shape[1]
+    for start in range(0, n_tools, chunk_size):
+        similarity = (transposed[start:start + chunk_size] @ matrix).tocsr()
+        for offset in range(similarity.shape[0]):
+            row = start + offset
+            lo, hi = similarity.indptr[offset], similarity.indptr[offset + 1]
+            columns = similarity.indices[lo:hi]
+            scores = similarity.data[lo:hi]
+            keep = (columns != row) & (scores >= MIN_SIMILARITY)
+            columns, scores = columns[keep], scores[keep]
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k - 1)[:top_k]
+                columns, scores = columns[best], scores[best]
+            order = np.argsort(-scores, kind="stable")
+            yield row, columns[order], scores[order]
+
+
+def load_neighbors(db, tool_ids: List[str]) -> Dict[str, dict]:
+    """一次 $in 取回多个工具的近邻，值为 {"neighbor_ids": [...], "scores": [...]}"""
+    return {
+        doc["tool_id"]: doc
+        for doc in db.tool_neighbors.find(
+            {"tool_id": {"$in": list(tool_ids)}},
+            {"_id": 0, "tool_id": 1, "neighbor_ids": 1, "scores": 1}
+        )
+    }
+
+
+def score_candidates(
+    candidate_ids: List[str],
+    weights: np.ndarray,
+    exclude: Set[str],
+    limit: int
+) -> List[Tuple[str, float]]:
+    """对候选工具按权重求和（bincount）并取前 limit 个，exclude 中的工具不参与排序"""
+    if not candidate_ids:
+        return []
+    unique_ids, inverse = np.unique(np.asarray(candidate_ids, dtype=object), return_inverse=True)
+    scores = np.bincount(inverse, weights=weights, minlength=len(unique_ids))
+    if exclude:
+        scores[np.isin(unique_ids, list(exclude))] = -np.inf
+    order = np.argsort(-scores, kind="stable")[:limit]
+    return [(unique_ids[i], float(scores[i])) for i in order if scores[i] != -np.inf]
+
+
+def recommend_for_user(db, user_id: str, limit: int) -> List[Tuple[str, float]]:
+    """按用户的收藏、评分和浏览历史打分推荐工具，查询次数固定，与历史长度无关"""
+    # 获取用户的收藏、评分和浏览过的工具，只取 tool_id
+    favorite_tool_ids = [favorite["tool_id"] for favorite in db.favorites.find({"user_id": user_id}, {"tool_id": 1})]
+    rated_tool_ids = [rating["tool_id"] for rating in db.ratings.find({"user_id": user_id}, {"tool_id": 1})]
+    viewed_tool_ids = [view["tool_id"] for view in db.user_views.find({"user_id": user_id}, {"tool_id": 1})]
+
+    # 一次 $in 查询取回全部来源工具的相关工具
+    history = favorite_tool_ids + rated_tool_ids + viewed_tool_ids
+    source_ids = [ObjectId(tool_id) for tool_id in set(history) if ObjectId.is_valid(tool_id)]
+    related_by_source = {
+        str(tool["_id"]): tool.get("related_tools") or []
+        for tool in db.tools.find({"_id": {"$in": source_ids}}, {"related_tools": 1})
+    }
+
+    # 候选工具 = 人工维护的相关工具（每次出现计 1 分）+ 协同过滤近邻（计相似度），
+    # 同一来源工具出现在多个历史列表中时分别计入
+    neighbors_by_source = load_neighbors(db, set(history))
+    candidate_ids = []
+    weights = []
+    for tool_id in history:
+        related = related_by_source.get(tool_id, [])
+        candidate_ids.extend(str(tool["_id"]) for tool in related)
+        weights.append(np.ones(len(related)))
+        neighbors = neighbors_by_source.get(tool_id)
+        if neighbors:
+            candidate_ids.extend(neighbors["neighbor_ids"])
+            weights.append(np.asarray(neighbors["scores"], dtype=np.float64))
+
+    # 向量化求和打分，排除用户已经收藏、评分或浏览过的工具
+    return score_candidates(
+        candidate_ids,
+        np.concatenate(weights) if weights else np.empty(0),
+        set(history),
+        limit
+    )
+
+
+def rebuild_tool_neighbors(
+    db,
+    top_k: int = TOP_K,
+    chunk_size: int = SIMILARITY_CHUNK_SIZE,
+    progress: Optional[Callable[[str], None]] = print
+) -> dict:
+    started = time.perf_counter()
+    db.tool_neighbors.create_index("tool_id", unique=True)
+    matrix, tool_ids = build_interaction_matrix(db)
+    if progress:
+        progress(f"interaction matrix: {matrix.shape[0]} users x {matrix.shape[1]} tools, {matrix.nnz} entries")
+
+    now = datetime.utcnow()
+    ops = []
+    for row, columns, scores in top_k_neighbors(matrix, top_k, chunk_size):
+        ops.append(ReplaceOne(
+            {"tool_id": tool_ids[row]},
+            {
+                "tool_id": tool_ids[row],
+                "neighbor_ids": tool_ids[columns].tolist(),
+                "scores": np.round(scores, 6).tolist(),
+                "updated_at": now
+            },
+            upsert=True
+        ))
+        if len(ops) >= chunk_size:
+            db.tool_neighbors.bulk_write(ops, ordered=False)
+            ops = []
+            if progress:
+                progress(f"[{row + 1}/{len(tool_ids)}] tools")
+    if ops:
+        db.tool_neighbors.bulk_write(ops, ordered=False)
+
+    # 已没有任何交互的工具不再保留近邻
+    stale = db.tool_neighbors.delete_many({"updated_at": {"$lt": now}}).deleted_count
+    elapsed = time.perf_counter() - started
+    return {
+        "users": matrix.shape[0],
+        "tools": len(tool_ids),
+        "interactions": int(matrix.nnz),
+        "removed": stale,
+        "elapsed_seconds": round(elapsed, 3)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离线计算工具近邻（物品协同过滤）")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--chunk-size", type=int, default=SIMILARITY_CHUNK_SIZE)
+    args = parser.parse_args()
+    summary = rebuild_tool_neighbors(get_sync_database(), args.top_k, args.chunk_size)
+    print(
+        f"built neighbors for {summary['tools']} tools from {summary['users']} users "
+        f"({summary['interactions']} interactions, {summary['removed']} removed) in {summary['elapsed_seconds']}s"
+    )
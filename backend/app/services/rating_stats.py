@@ -0,0 +1,305 @@
+"""评分统计的服务端聚合
+
+全量重建可作为命令行或定时任务运行（在 backend 目录下）：
+    python -m app.services.rating_stats --chunk-size 1000
+"""
+import argparse
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.database import get_sync_database
+from app.models.rating import RatingStats
+from app.services.cache import TTLCache
+
+DEFAULT_DISTRIBUTION = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
+
+# 全量重建时每条聚合处理的工具数
+REBUILD_CHUNK_SIZE = 1000
+
+# 贝叶斯平均分的先验（全站平均分 mean、先验票数 weight），由全量重建写入 system_configs
+RATING_PRIOR_KEY = "rating_prior"
+DEFAULT_PRIOR = {"mean": 3.0, "weight": 5.0}
+_prior_cache = TTLCache(maxsize=1, ttl=60)
+
+# 旧版 /tools/{id}/rating 接口写入的评分只有 rating 字段、没有 score，不计入统计
+HAS_SCORE = {"score": {"$type": "number"}}
+
+
+def load_prior(db) -> dict:
+    if (prior := _prior_cache.get(RATING_PRIOR_KEY)) is None:
+        config = db.system_configs.find_one({"key": RATING_PRIOR_KEY})
+        prior = config["value"] if config else DEFAULT_PRIOR
+        _prior_cache.set(RATING_PRIOR_KEY, prior)
+    return prior
+
+
+async def load_prior_async(db) -> dict:
+    """load_prior 的 Motor 版本，与其共用缓存"""
+    if (prior := _prior_cache.get(RATING_PRIOR_KEY)) is None:
+        config = await db.system_configs.find_one({"key": RATING_PRIOR_KEY})
+        prior = config["value"] if config else DEFAULT_PRIOR
+        _prior_cache.set(RATING_PRIOR_KEY, prior)
+    return prior
+
+
+async def backfill_bayesian_ratings(db) -> int:
+    """为还没有 bayesian_rating 的工具补上先验均值，否则 top_rated 倒序时它们会排在所有新工具之后
+
+    已有评分的工具在下次评分变更或全量重建（python -m app.services.rating_stats）时得到准确值。
+    """
+    prior = await load_prior_async(db)
+    result = await db.tools.update_many(
+        {"bayesian_rating": {"$exists": False}},
+        {"$set": {"bayesian_rating": prior["mean"]}}
+    )
+    return result.modified_count
+
+
+def bayesian_score(score_sum: float, total_ratings: int, prior: dict) -> float:
+    """(C·m + Σscore) / (C + n)：评分少的工具向全站平均分收缩"""
+    return (prior["weight"] * prior["mean"] + score_sum) / (prior["weight"] + total_ratings)
+
+
+def average_score_stage() -> dict:
+    """按文档当前的 score_sum / total_ratings 计算平均分，用于管道式更新"""
+    return {"$set": {"average_score": {"$cond": [
+        {"$gt": ["$total_ratings", 0]},
+        {"$divide": ["$score_sum", "$total_ratings"]},
+        0
+    ]}}}
+
+
+def set_bayesian_rating(db, tool_id: str, score_sum: float, total_ratings: int, version: Optional[int] = None):
+    """version 为 rating_stats 的版本号，给出时只有更新的版本才能覆盖，避免并发写入时旧值覆盖新值"""
+    query = {"_id": ObjectId(tool_id)}
+    update = {"bayesian_rating": bayesian_score(score_sum, total_ratings, load_prior(db))}
+    if version is not None:
+        query["$or"] = [{"rating_version": {"$lt": version}}, {"rating_version": {"$exists": False}}]
+        update["rating_version"] = version
+    db.tools.update_one(query, {"$set": update})
+
+
+def update_bayesian_ratings(db, chunk_size: int = REBUILD_CHUNK_SIZE) -> dict:
+    """用 NumPy 一次算出全部工具的贝叶斯平均分，并重新估计先验"""
+    docs = [
+        doc for doc in db.rating_stats.find({}, {"_id": 0, "tool_id": 1, "score_sum": 1, "total_ratings": 1})
+        if ObjectId.is_valid(doc["tool_id"])
+    ]
+    sums = np.fromiter((doc.get("score_sum", 0) for doc in docs), dtype=np.float64, count=len(docs))
+    counts = np.fromiter((doc.get("total_ratings", 0) for doc in docs), dtype=np.float64, count=len(docs))
+
+    # 先验：全站平均分，先验票数取有评分工具评分数的中位数
+    rated = counts > 0
+    prior = dict(DEFAULT_PRIOR)
+    if rated.any():
+        prior = {"mean": float(sums.sum() / counts.sum()), "weight": float(np.median(counts[rated]))}
+    scores = (prior["weight"] * prior["mean"] + sums) / (prior["weight"] + counts)
+
+    now = datetime.utcnow()
+    db.system_configs.update_one(
+        {"key": RATING_PRIOR_KEY},
+        {
+            "$set": {"value": prior, "updated_at": now, "description": "贝叶斯平均分先验"},
+            "$setOnInsert": {"is_public": False, "created_at": now}
+        },
+        upsert=True
+    )
+    _prior_cache.clear()
+
+    for start in range(0, len(docs), chunk_size):
+        db.tools.bulk_write([
+            UpdateOne({"_id": ObjectId(doc["tool_id"])}, {"$set": {"bayesian_rating": float(score)}})
+            for doc, score in zip(docs[start:start + chunk_size], scores[start:start + chunk_size])
+        ], ordered=False)
+    # 从未被评分的工具取先验平均分
+    db.tools.update_many({"bayesian_rating": {"$exists": False}}, {"$set": {"bayesian_rating": prior["mean"]}})
+    return prior
+
+
+def score_stages() -> list:
+    """按工具汇总评分数、总分、平均分和分数分布"""
+    return [
+        {"$group": {
+            "_id": {"tool_id": "$tool_id", "bucket": {"$toString": {"$toInt": {"$floor": "$score"}}}},
+            "count": {"$sum": 1},
+            "sum": {"$sum": "$score"}
+        }},
+        {"$group": {
+            "_id": "$_id.tool_id",
+            "total_ratings": {"$sum": "$count"},
+            "score_sum": {"$sum": "$sum"},
+            "buckets": {"$push": {"k": "$_id.bucket", "v": "$count"}}
+        }},
+        {"$project": {
+            "_id": 0,
+            "tool_id": "$_id",
+            "total_ratings": 1,
+            "score_sum": 1,
+            "average_score": {"$divide": ["$score_sum", "$total_ratings"]},
+            "score_distribution": {"$mergeObjects": [DEFAULT_DISTRIBUTION, {"$arrayToObject": "$buckets"}]}
+        }}
+    ]
+
+
+def tag_stages() -> list:
+    """按工具汇总评分标签次数，标签名的处理与 routes.rating.stat_key 一致"""
+    return [
+        {"$unwind": "$tags"},
+        {"$group": {
+            "_id": {
+                "tool_id": "$tool_id",
+                "tag": {"$ltrim": {
+                    "input": {"$replaceAll": {"input": "$tags", "find": ".", "replacement": "．"}},
+                    "chars": {"$literal": "$"}
+                }}
+            },
+            "count": {"$sum": 1}
+        }},
+        {"$group": {
+            "_id": "$_id.tool_id",
+            "tags": {"$push": {"k": "$_id.tag", "v": "$count"}}
+        }},
+        {"$project": {"_id": 0, "tool_id": "$_id", "tag_stats": {"$arrayToObject": "$tags"}}}
+    ]
+
+
+def aggregate_rating_stats(db, tool_ids: List[str]) -> Dict[str, RatingStats]:
+    """一次聚合计算多个工具的评分统计并补建缺失的 rating_stats，没有评分的工具返回零值
+
+    只计算并写入 tools 中存在的工具，不存在的 id 返回零值且不落库；已有的统计不会被覆盖。
+    """
+    object_ids = [ObjectId(tool_id) for tool_id in tool_ids if ObjectId.is_valid(tool_id)]
+    existing = [
+        str(doc["_id"]) for doc in db.tools.find({"_id": {"$in": object_ids}}, {"_id": 1})
+    ] if object_ids else []
+
+    stats = {tool_id: {"tool_id": tool_id} for tool_id in existing}
+    if existing:
+        result = next(db.ratings.aggregate([
+            {"$match": {**HAS_SCORE, "tool_id": {"$in": existing}}},
+            {"$facet": {"scores": score_stages(), "tags": tag_stages()}}
+        ]))
+        for row in result["scores"] + result["tags"]:
+            stats[row["tool_id"]].update(row)
+
+    now = datetime.utcnow()
+    computed = {tool_id: RatingStats(**doc, updated_at=now) for tool_id, doc in stats.items()}
+    defaults = {tool_id: RatingStats(tool_id=tool_id) for tool_id in tool_ids if tool_id not in computed}
+    if computed:
+        # 只补建缺失的统计：聚合期间并发的评分可能已写入更新的统计，不能用这次的结果覆盖
+        result = db.rating_stats.bulk_write([
+            UpdateOne({"tool_id": tool_id}, {"$setOnInsert": item.dict()}, upsert=True)
+            for tool_id, item in computed.items()
+        ], ordered=False)
+        inserted = [
+            (doc["tool_id"], computed[doc["tool_id"]])
+            for doc in db.rating_stats.find({"_id": {"$in": list(result.upserted_ids.values())}}, {"tool_id": 1})
+        ] if result.upserted_ids else []
+        if inserted:
+            # 贝叶斯平均分同样只写给本次新建统计、且尚未被增量路径按版本写过的工具
+            prior = load_prior(db)
+            db.tools.bulk_write([
+                UpdateOne(
+                    {"_id": ObjectId(tool_id), "rating_version": {"$exists": False}},
+                    {"$set": {"bayesian_rating": bayesian_score(item.score_sum, item.total_ratings, prior)}}
+                )
+                for tool_id, item in inserted
+            ], ordered=False)
+    return {**computed, **defaults}
+
+
+def _merge_into_stats() -> dict:
+    return {"$merge": {
+        "into": "rating_stats",
+        "on": "tool_id",
+        "whenMatched": "merge",
+        "whenNotMatched": "insert"
+    }}
+
+
+def rebuild_rating_stats(
+    db,
+    chunk_size: int = REBUILD_CHUNK_SIZE,
+    progress: Optional[Callable[[str], None]] = print
+) -> dict:
+    """在 MongoDB 端重算全部工具的评分统计并 $merge 回 rating_stats，再刷新贝叶斯平均分"""
+    started = time.perf_counter()
+    # $merge 按 tool_id 匹配，要求唯一索引
+    db.rating_stats.create_index("tool_id", unique=True)
+
+    counts = [
+        (row["_id"], row["count"])
+        for row in db.ratings.aggregate([
+            {"$match": HAS_SCORE},
+            {"$group": {"_id": "$tool_id", "count": {"$sum": 1}}}
+        ], allowDiskUse=True)
+        if row["_id"] is not None
+    ]
+    total_tools = len(counts)
+    total_ratings = sum(count for _, count in counts)
+
+    done_tools = done_ratings = 0
+    for start in range(0, total_tools, chunk_size):
+        chunk = counts[start:start + chunk_size]
+        match = {"$match": {**HAS_SCORE, "tool_id": {"$in": [tool_id for tool_id, _ in chunk]}}}
+        # 先写分数统计并清空标签统计，再写入标签统计，去掉已不存在的标签
+        db.ratings.aggregate([
+            match,
+            *score_stages(),
+            {"$set": {"tag_stats": {"$literal": {}}, "updated_at": "$$NOW"}},
+            _merge_into_stats()
+        ], allowDiskUse=True)
+        db.ratings.aggregate([match, *tag_stages(), _merge_into_stats()], allowDiskUse=True)
+
+        done_tools += len(chunk)
+        done_ratings += sum(count for _, count in chunk)
+        if progress:
+            elapsed = time.perf_counter() - started
+            progress(
+                f"[{done_tools}/{total_tools}] tools  {done_ratings}/{total_ratings} ratings  "
+                f"{done_ratings / elapsed:.0f} ratings/s"
+            )
+
+    # 评分已全部删除的工具归零
+    rated = {tool_id for tool_id, _ in counts}
+    stale = [doc["tool_id"] for doc in db.rating_stats.find({}, {"tool_id": 1}) if doc["tool_id"] not in rated]
+    if stale:
+        db.rating_stats.update_many({"tool_id": {"$in": stale}}, {"$set": {
+            "average_score": 0,
+            "total_ratings": 0,
+            "score_sum": 0,
+            "score_distribution": DEFAULT_DISTRIBUTION,
+            "tag_stats": {},
+            "updated_at": datetime.utcnow()
+        }})
+
+    prior = update_bayesian_ratings(db, chunk_size)
+    if progress:
+        progress(f"bayesian prior: mean={prior['mean']:.3f} weight={prior['weight']:.1f}")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "tools": total_tools,
+        "ratings": total_ratings,
+        "reset": len(stale),
+        "elapsed_seconds": round(elapsed, 3),
+        "tools_per_second": round(total_tools / elapsed) if elapsed else 0,
+        "ratings_per_second": round(total_ratings / elapsed) if elapsed else 0
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="全量重建 rating_stats")
+    parser.add_argument("--chunk-size", type=int, default=REBUILD_CHUNK_SIZE)
+    args = parser.parse_args()
+    summary = rebuild_rating_stats(get_sync_database(), args.chunk_size)
+    print(
+        f"rebuilt {summary['tools']} tools from {summary['ratings']} ratings "
+        f"({summary['reset']} reset) in {summary['elapsed_seconds']}s: "
+        f"{summary['tools_per_second']} tools/s, {summary['ratings_per_second']} ratings/s"
+    )
@@ -0,0 +1,143 @@
+"""分享与评分的按小时/按天汇总
+
+写入分享或评分时同时累加所在小时和所在天的 stat_buckets 文档，趋势查询只读取区间内的少量汇总文档。
+评分按评分的 created_at 归桶，修改和删除评分时对原桶做增量，因此各桶之和始终等于当前评分总数。
+从原始集合重建全部汇总（在 backend 目录下）：
+    python -m app.services.rollups
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from app.database import get_sync_database
+from app.services.share_stats import platform_key, platform_key_expr
+
+SHARES = "shares"
+RATINGS = "ratings"
+METRICS = (SHARES, RATINGS)
+
+HOUR = "hour"
+DAY = "day"
+GRANULARITIES = {HOUR: timedelta(hours=1), DAY: timedelta(days=1)}
+
+# 单次趋势查询最多覆盖的桶数：两周的小时桶或一年的天桶
+MAX_BUCKETS = {HOUR: 24 * 14, DAY: 366}
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    at = at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0) if granularity == DAY else at
+
+
+def _bucket_ops(tool_id: str, metric: str, at: datetime, inc: Dict[str, float]) -> List[UpdateOne]:
+    now = datetime.utcnow()
+    return [
+        UpdateOne(
+            {"tool_id": tool_id, "metric": metric, "granularity": granularity, "start": bucket_start(at, granularity)},
+            {"$inc": inc, "$set": {"updated_at": now}},
+            upsert=True
+        )
+        for granularity in GRANULARITIES
+    ]
+
+
+def record_share(db, tool_id: str, platform: str, at: Optional[datetime] = None):
+    inc = {"count": 1, f"platforms.{platform_key(platform)}": 1}
+    db.stat_buckets.bulk_write(_bucket_ops(tool_id, SHARES, at or datetime.utcnow(), inc), ordered=False)
+
+
+def record_rating(db, tool_id: str, old: Optional[dict] = None, new: Optional[dict] = None):
+    """按评分的 created_at 归桶累加评分数与总分，old/new 的含义与 apply_rating_delta 相同"""
+    # 旧版接口写入的评分没有 score，不计入汇总
+    old, new = (rating if rating and isinstance(rating.get("score"), (int, float)) else None for rating in (old, new))
+    if old is None and new is None:
+        return
+    inc: Dict[str, float] = {}
+    if old is None:
+        inc["count"] = 1
+    elif new is None:
+        inc["count"] = -1
+    score_delta = (new["score"] if new else 0) - (old["score"] if old else 0)
+    if score_delta:
+        inc["score_sum"] = score_delta
+    if not inc:
+        return
+    # 修改评分时按原评分的创建时间归桶，与新增、删除时落在同一个桶
+    at = (old or new).get("created_at") or datetime.utcnow()
+    db.stat_buckets.bulk_write(_bucket_ops(tool_id, RATINGS, at, inc), ordered=False)
+
+
+def get_buckets(db, tool_id: str, metric: str, granularity: str, start: datetime, end: datetime) -> List[dict]:
+    """返回 [start, end) 内的汇总桶，按时间升序；没有数据的时间段不返回"""
+    return list(
+        db.stat_buckets.find(
+            {
+                "tool_id": tool_id,
+                "metric": metric,
+                "granularity": granularity,
+                "start": {"$gte": bucket_start(start, granularity), "$lt": end}
+            },
+            {"_id": 0, "tool_id": 0, "metric": 0, "granularity": 0, "updated_at": 0}
+        ).sort("start", 1)
+    )
+
+
+def _rollup_stages(metric: str, granularity: str) -> list:
+    bucket = {"tool_id": "$tool_id", "start": {"$dateTrunc": {"date": "$created_at", "unit": granularity}}}
+    if metric == SHARES:
+        # 先按平台计数，再汇总成桶内的 platforms 子文档
+        group_stages = [
+            {"$group": {"_id": {**bucket, "platform": platform_key_expr()}, "count": {"$sum": 1}}},
+            {"$group": {
+                "_id": {"tool_id": "$_id.tool_id", "start": "$_id.start"},
+                "count": {"$sum": "$count"},
+                "platforms": {"$push": {"k": "$_id.platform", "v": "$count"}}
+            }}
+        ]
+        fields = {"count": 1, "platforms": {"$arrayToObject": "$platforms"}}
+    else:
+        group_stages = [{"$group": {"_id": bucket, "count": {"$sum": 1}, "score_sum": {"$sum": "$score"}}}]
+        fields = {"count": 1, "score_sum": 1}
+    return [
+        {"$match": {"tool_id": {"$ne": None}, "created_at": {"$type": "date"}}},
+        *group_stages,
+        {"$project": {
+            "_id": 0,
+            "tool_id": "$_id.tool_id",
+            "metric": {"$literal": metric},
+            "granularity": {"$literal": granularity},
+            "start": "$_id.start",
+            **fields,
+            "updated_at": "$$NOW"
+        }},
+        {"$merge": {
+            "into": "stat_buckets",
+            "on": ["tool_id", "metric", "granularity", "start"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }}
+    ]
+
+
+def rebuild_rollups(db) -> dict:
+    """清空后从 shares、ratings 重建全部汇总桶"""
+    started = time.perf_counter()
+    db.stat_buckets.create_index([("tool_id", 1), ("metric", 1), ("granularity", 1), ("start", 1)], unique=True)
+    db.stat_buckets.delete_many({})
+    for metric in METRICS:
+        for granularity in GRANULARITIES:
+            db[metric].aggregate(_rollup_stages(metric, granularity), allowDiskUse=True)
+    return {
+        "buckets": db.stat_buckets.estimated_document_count(),
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="从原始分享与评分记录重建 stat_buckets")
+    parser.parse_args()
+    summary = rebuild_rollups(get_sync_database())
+    print(f"rebuilt {summary['buckets']} buckets in {summary['elapsed_seconds']}s")
@@ -0,0 +1,181 @@
+import bisect
+import math
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 中日韩统一表意文字（含扩展A）与兼容区，按二元组切分
+CJK_RANGES = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+TOKEN_RE = re.compile(r"[a-z0-9]+|[" + CJK_RANGES + r"]+")
+CJK_RE = re.compile(r"[" + CJK_RANGES + r"]")
+
+# 字段权重：名称命中比描述命中更重要
+FIELD_WEIGHTS = {"name": 3, "tags": 2, "description": 1}
+
+# BM25 参数
+K1 = 1.2
+B = 0.75
+
+# 查询词短于该长度时不做前缀扩展，只精确匹配，避免单字母前缀展开整段词表
+MIN_PREFIX_LENGTH = 2
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def _split(text: str) -> List[str]:
+    return TOKEN_RE.findall(normalize(text))
+
+
+def tokenize(text: str) -> List[str]:
+    """切分文档文本：拉丁字母按词，中文连续段输出单字和二元组"""
+    tokens = []
+    for run in _split(text):
+        if CJK_RE.match(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def tokenize_query(text: str) -> List[str]:
+    """切分查询文本：中文段长度大于1时只用二元组，与文档切分保持可匹配"""
+    tokens = []
+    for run in _split(text):
+        if CJK_RE.match(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+class SearchIndex:
+    """工具集合的内存倒排索引，使用 BM25 排序，随工具增删改增量更新"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.doc_len: Dict[str, int] = {}
+        self.total_len = 0
+        # 有序词表，用于最后一个查询词的前缀匹配
+        self.vocabulary: List[str] = []
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def clear(self):
+        self.__init__()
+
+    def add(self, tool: dict):
+        tool_id = str(tool["_id"])
+        if tool_id in self.doc_len:
+            self.remove(tool_id)
+
+        terms: Dict[str, int] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            value = tool.get(field)
+            if not value:
+                continue
+            if isinstance(value, list):
+                value = " ".join(str(v) for v in value)
+            for token in tokenize(value):
+                terms[token] = terms.get(token, 0) + weight
+
+        for term, tf in terms.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                bisect.insort(self.vocabulary, term)
+            posting[tool_id] = tf
+
+        length = sum(terms.values())
+        self.doc_terms[tool_id] = terms
+        self.doc_len[tool_id] = length
+        self.total_len += length
+
+    def remove(self, tool_id: str):
+        tool_id = str(tool_id)
+        terms = self.doc_terms.pop(tool_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings[term]
+            del posting[tool_id]
+            if not posting:
+                del self.postings[term]
+                i = bisect.bisect_left(self.vocabulary, term)
+                del self.vocabulary[i]
+        self.total_len -= self.doc_len.pop(tool_id)
+
+    def build(self, tools: Iterable[dict]):
+        self.clear()
+        for tool in tools:
+            self.add(tool)
+
+    async def rebuild(self, db):
+        self.clear()
+        async for tool in db.tools.find({}, {"name": 1, "description": 1, "tags": 1}):
+            self.add(tool)
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        """返回以 prefix 开头的全部词项；prefix 过短时只返回其自身"""
+        if len(prefix) < MIN_PREFIX_LENGTH:
+            return [prefix]
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\uffff", start)
+        return self.vocabulary[start:end]
+
+    def search(self, text: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """返回包含全部查询词的文档 (tool_id, score)，按 BM25 得分降序
+
+        最后一个拉丁词（不短于 MIN_PREFIX_LENGTH）按前缀匹配，以便输入过程中逐字搜索。
+        """
+        tokens = tokenize_query(text)
+        if not tokens or not self.doc_len:
+            return []
+
+        # 每个查询词对应一组可替换的索引词（前缀扩展时多于一个）
+        groups = [[token] for token in dict.fromkeys(tokens[:-1])]
+        last = tokens[-1]
+        if CJK_RE.match(last):
+            groups.append([last])
+        else:
+            groups.append(self._expand_prefix(last))
+
+        n_docs = len(self.doc_len)
+        avg_len = self.total_len / n_docs
+        scores: Optional[Dict[str, float]] = None
+
+        # 先处理命中文档最少的词，尽早缩小候选集
+        groups.sort(key=lambda terms: sum(len(self.postings.get(t, ())) for t in terms))
+        for terms in groups:
+            group_scores: Dict[str, float] = {}
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                candidates = posting.keys() if scores is None else (d for d in scores if d in posting)
+                for doc_id in candidates:
+                    tf = posting[doc_id]
+                    norm = K1 * (1 - B + B * self.doc_len[doc_id] / avg_len)
+                    score = idf * tf * (K1 + 1) / (tf + norm)
+                    if score > group_scores.get(doc_id, 0.0):
+                        group_scores[doc_id] = score
+            if scores is None:
+                scores = group_scores
+            else:
+                scores = {d: s + group_scores[d] for d, s in scores.items() if d in group_scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
+
+    def search_ids(self, text: str) -> List[str]:
+        return [tool_id for tool_id, _ in self.search(text)]
+
+
+search_index = SearchIndex()
@@ -0,0 +1,90 @@
+"""分享统计的对账任务
+
+记录分享时只对 share_stats 做一次 $inc，计数可能因写入失败或手工改库而偏离 shares 集合，
+可定期运行对账（在 backend 目录下）：
+    python -m app.services.share_stats
+"""
+import argparse
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+from app.database import get_sync_database
+
+
+def platform_key(platform: str) -> str:
+    # 平台名作为 platform_stats 的字段名，不能包含 "." 或以 "$" 开头
+    return str(platform).replace(".", "．").lstrip("$")
+
+
+def platform_key_expr() -> dict:
+    """聚合管道中与 platform_key 等价的表达式"""
+    return {"$ltrim": {
+        "input": {"$replaceAll": {"input": {"$toString": "$platform"}, "find": ".", "replacement": "．"}},
+        "chars": {"$literal": "$"}
+    }}
+
+
+def platform_stages() -> list:
+    """按工具汇总分享总数与各平台次数，平台名的处理与 platform_key 一致"""
+    return [
+        {"$group": {
+            "_id": {
+                "tool_id": "$tool_id",
+                "platform": platform_key_expr()
+            },
+            "count": {"$sum": 1}
+        }},
+        {"$group": {
+            "_id": "$_id.tool_id",
+            "total_shares": {"$sum": "$count"},
+            "platforms": {"$push": {"k": "$_id.platform", "v": "$count"}}
+        }},
+        {"$project": {
+            "_id": 0,
+            "tool_id": "$_id",
+            "total_shares": 1,
+            "platform_stats": {"$arrayToObject": "$platforms"},
+            "updated_at": "$$NOW"
+        }}
+    ]
+
+
+def reconcile_share_stats(db, progress: Optional[Callable[[str], None]] = print) -> dict:
+    """从 shares 集合重算全部工具的分享统计并 $merge 回 share_stats"""
+    started = time.perf_counter()
+    # $merge 按 tool_id 匹配，要求唯一索引
+    db.share_stats.create_index("tool_id", unique=True)
+
+    db.shares.aggregate([
+        {"$match": {"tool_id": {"$ne": None}}},
+        *platform_stages(),
+        {"$merge": {
+            "into": "share_stats",
+            "on": "tool_id",
+            "whenMatched": "merge",
+            "whenNotMatched": "insert"
+        }}
+    ], allowDiskUse=True)
+
+    # 分享记录已全部删除的工具归零
+    shared = set(db.shares.distinct("tool_id"))
+    stale = [doc["tool_id"] for doc in db.share_stats.find({}, {"tool_id": 1}) if doc["tool_id"] not in shared]
+    if stale:
+        db.share_stats.update_many({"tool_id": {"$in": stale}}, {"$set": {
+            "total_shares": 0,
+            "platform_stats": {},
+            "updated_at": datetime.utcnow()
+        }})
+
+    elapsed = time.perf_counter() - started
+    summary = {"tools": len(shared), "reset": len(stale), "elapsed_seconds": round(elapsed, 3)}
+    if progress:
+        progress(f"reconciled {summary['tools']} tools ({summary['reset']} reset) in {summary['elapsed_seconds']}s")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按 shares 集合对账 share_stats")
+    parser.parse_args()
+    reconcile_share_stats(get_sync_database())
@@ -0,0 +1,275 @@
+"""基于 TF-IDF 的相似工具
+
+默认始终精确计算。工具数较多时可构建 LSH 近似最近邻索引并持久化（在 backend 目录下）：
+    python -m app.services.similarity --output data/tool_ann
+用 benchmarks/bench_ann.py 确认召回率满足要求后，设置 TOOL_ANN_ENABLED=1，服务启动时 mmap 加载。
+"""
+import argparse
+import asyncio
+import math
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.database import get_sync_database
+from app.services.ann import DEFAULT_BITS, DEFAULT_TABLES, LSHIndex
+from app.services.search_index import tokenize
+
+# 字段权重：名称、标签、分类比描述更能代表工具的用途
+FIELD_WEIGHTS = {"name": 3, "tags": 2, "category": 2, "description": 1}
+
+# 近似检索会损失召回，需显式开启；开启后工具数达到 ANN_MIN_TOOLS 才用近似检索，否则仍精确计算
+ANN_ENABLED = os.getenv("TOOL_ANN_ENABLED", "").lower() in ("1", "true", "yes")
+# LSH 索引目录
+ANN_INDEX_PATH = os.getenv("TOOL_ANN_INDEX_PATH", "data/tool_ann")
+# 稀疏矩阵乘向量在十万级以下通常比 LSH 候选精排更快，可用 benchmarks/bench_ann.py 实测后调整
+ANN_MIN_TOOLS = int(os.getenv("TOOL_ANN_MIN_TOOLS", 100000))
+
+
+def _term_counts(tool: dict) -> Dict[str, float]:
+    terms: Dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        value = tool.get(field)
+        if not value:
+            continue
+        if isinstance(value, list):
+            value = " ".join(str(v) for v in value)
+        for token in tokenize(str(value)):
+            terms[token] = terms.get(token, 0) + weight
+    return terms
+
+
+class SimilarityIndex:
+    """基于 TF-IDF 的相似工具索引
+
+    每个工具的词频随增删改增量更新，矩阵由 schedule_refresh 在线程中重建后换入，
+    重建期间查询继续使用上一版矩阵：行为 L2 归一化的 TF-IDF 向量（float32 CSR），
+    相似度即一次矩阵乘向量。挂接 LSH 索引后，大目录下只对候选行做精排。
+    """
+
+    def __init__(self):
+        self.doc_terms: Dict[str, Dict[str, float]] = {}
+        self.doc_freq: Dict[str, int] = {}
+        self._matrix: Optional[sparse.csr_matrix] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._terms: List[str] = []
+        # 每次增删加一；_built 为当前矩阵对应的版本
+        self._generation = 0
+        self._built = -1
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.ann: Optional[LSHIndex] = None
+        # LSH 索引行号 -> 矩阵行号，已删除或更新过的工具为 -1（更新后的版本在 ann.extra 中）
+        self._ann_rows: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def __contains__(self, tool_id: str) -> bool:
+        return str(tool_id) in self.doc_terms
+
+    def clear(self):
+        self.__init__()
+
+    def add(self, tool: dict):
+        tool_id = str(tool["_id"])
+        if tool_id in self.doc_terms:
+            self.remove(tool_id)
+        terms = _term_counts(tool)
+        self.doc_terms[tool_id] = terms
+        for term in terms:
+            self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+        self._generation += 1
+        if self.ann is not None:
+            self.ann.add(tool_id, self.signature(tool_id))
+
+    def remove(self, tool_id: str):
+        terms = self.doc_terms.pop(str(tool_id), None)
+        if terms is None:
+            return
+        for term in terms:
+            count = self.doc_freq[term] - 1
+            if count:
+                self.doc_freq[term] = count
+            else:
+                del self.doc_freq[term]
+        self._generation += 1
+        if self.ann is not None:
+            self.ann.remove(str(tool_id))
+
+    def build(self, tools: Iterable[dict]):
+        self.clear()
+        for tool in tools:
+            self.add(tool)
+
+    async def rebuild(self, db):
+        self.clear()
+        async for tool in db.tools.find({}, {"name": 1, "description": 1, "tags": 1, "category": 1}):
+            self.add(tool)
+
+    @property
+    def stale(self) -> bool:
+        return self._built != self._generation
+
+    def _idf(self, df: int, n_docs: Optional[int] = None) -> float:
+        n_docs = len(self.doc_terms) if n_docs is None else n_docs
+        return math.log((1 + n_docs) / (1 + df)) + 1
+
+    def signature(self, tool_id: str) -> np.ndarray:
+        """按当前词频和 IDF 计算工具的 LSH 签名，不需要重建矩阵"""
+        terms = self.doc_terms[str(tool_id)]
+        weights = np.array([tf * self._idf(self.doc_freq[term]) for term, tf in terms.items()], dtype=np.float32)
+        return self.ann.signature(list(terms), weights)
+
+    def attach_ann(self, ann: LSHIndex):
+        """挂接持久化的 LSH 索引，并补齐索引构建之后新增、删除的工具"""
+        self.ann = ann
+        persisted = set(ann.ids.tolist())
+        for tool_id in persisted - self.doc_terms.keys():
+            ann.remove(tool_id)
+        for tool_id in self.doc_terms.keys() - persisted:
+            ann.add(tool_id, self.signature(tool_id))
+        if self._matrix is not None:
+            self._map_ann_rows()
+
+    def _map_ann_rows(self):
+        self._ann_rows = np.array(
+            [-1 if tool_id in self.ann.removed else self._rows.get(tool_id, -1) for tool_id in self.ann.ids.tolist()],
+            dtype=np.int64
+        )
+
+    def load_ann(self, path: str = ANN_INDEX_PATH):
+        if os.path.exists(os.path.join(path, "meta.json")):
+            self.attach_ann(LSHIndex.load(path))
+
+    def _compute(self, doc_terms: Dict[str, Dict[str, float]], doc_freq: Dict[str, int]):
+        """由词频快照计算矩阵，不读写实例状态，可在线程中运行"""
+        n_docs = len(doc_terms)
+        columns = {term: i for i, term in enumerate(doc_freq)}
+        idf = np.array([self._idf(df, n_docs) for df in doc_freq.values()], dtype=np.float32)
+
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for terms in doc_terms.values():
+            indices.extend(columns[term] for term in terms)
+            data.extend(terms.values())
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(n_docs, len(columns))
+        )
+        matrix = (matrix @ sparse.diags(idf)).tocsr()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        matrix = (sparse.diags(1.0 / norms).astype(np.float32) @ matrix).tocsr()
+        return matrix, list(doc_terms), list(columns)
+
+    def _swap(self, built, generation: int):
+        self._matrix, self._ids, self._terms = built
+        self._rows = {tool_id: i for i, tool_id in enumerate(self._ids)}
+        self._built = generation
+        if self.ann is not None:
+            self._map_ann_rows()
+
+    def _build(self):
+        self._swap(self._compute(self.doc_terms, self.doc_freq), self._generation)
+
+    async def refresh(self):
+        """在线程中重建矩阵后换入，重建期间又有增删则再重建一轮"""
+        while self.stale and self._refresh_task is asyncio.current_task():
+            generation = self._generation
+            # 增删只替换 doc_terms 中的值而不原地修改，浅拷贝即为一致的快照
+            built = await asyncio.to_thread(self._compute, dict(self.doc_terms), dict(self.doc_freq))
+            # 期间实例被清空或整体换掉（见 load_tool_indexes）时放弃这次结果
+            if self._refresh_task is not asyncio.current_task():
+                return
+            self._swap(built, generation)
+
+    def schedule_refresh(self) -> Optional[asyncio.Task]:
+        """增删后调用，返回进行中的重建任务；已有重建在进行时由其在结束前补上新的变更"""
+        if self.stale and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.get_running_loop().create_task(self.refresh())
+        return self._refresh_task if self.stale else None
+
+    @property
+    def matrix(self) -> sparse.csr_matrix:
+        """行顺序与 ids 一致的 L2 归一化 TF-IDF 矩阵（同步重建到最新，供离线任务使用）"""
+        if self.stale:
+            self._build()
+        return self._matrix
+
+    @property
+    def ids(self) -> List[str]:
+        if self.stale:
+            self._build()
+        return self._ids
+
+    @property
+    def terms(self) -> List[str]:
+        """矩阵各列对应的词项"""
+        if self.stale:
+            self._build()
+        return self._terms
+
+    def similar(self, tool_id: str, limit: int = 10, exact: bool = False) -> List[Tuple[str, float]]:
+        """返回与 tool_id 最相似的工具 (tool_id, 余弦相似度)，按相似度降序，不含自身
+
+        挂接了 LSH 索引且工具数不少于 ANN_MIN_TOOLS 时只对候选行计算相似度，exact=True 强制精确计算。
+        使用最近一次换入的矩阵，尚未计入矩阵的新工具暂时没有结果，已删除的工具不会返回。
+        """
+        if self._matrix is None:
+            self._build()
+        matrix = self._matrix
+        tool_id = str(tool_id)
+        row = self._rows.get(tool_id)
+        if row is None or tool_id not in self.doc_terms or limit <= 0:
+            return []
+
+        if self.ann is not None and not exact and len(self) >= ANN_MIN_TOOLS:
+            signature = self.signature(tool_id)
+            # 持久化部分中已删除或更新过的工具映射为 -1，更新后的版本只会出现在 extras 中，两者不重复
+            rows = self._ann_rows[self.ann.candidate_rows(signature)]
+            extras = [self._rows[c] for c in self.ann.candidate_extras(signature) if c in self._rows]
+            rows = np.concatenate([rows, np.asarray(extras, dtype=np.int64)])
+            rows = rows[(rows >= 0) & (rows != row)]
+            scores = (matrix[rows] @ matrix[row].T).toarray().ravel()
+        else:
+            rows = None
+            scores = (matrix @ matrix[row].T).toarray().ravel()
+            scores[row] = 0
+
+        k = min(limit, len(scores))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        found = ((self._ids[rows[i] if rows is not None else i], float(scores[i])) for i in best if scores[i] > 0)
+        return [(similar_id, score) for similar_id, score in found if similar_id in self.doc_terms]
+
+
+similarity_index = SimilarityIndex()
+
+
+def build_ann_index(index: SimilarityIndex, n_tables: int = DEFAULT_TABLES, n_bits: int = DEFAULT_BITS) -> LSHIndex:
+    return LSHIndex.build(index.ids, index.matrix, index.terms, n_tables, n_bits)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="构建并持久化工具相似度的 LSH 索引")
+    parser.add_argument("--output", default=ANN_INDEX_PATH)
+    parser.add_argument("--tables", type=int, default=DEFAULT_TABLES)
+    parser.add_argument("--bits", type=int, default=DEFAULT_BITS)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = SimilarityIndex()
+    index.build(get_sync_database().tools.find({}, {"name": 1, "description": 1, "tags": 1, "category": 1}))
+    ann = build_ann_index(index, args.tables, args.bits)
+    ann.save(args.output)
+    print(f"indexed {len(ann)} tools ({args.tables} tables x {args.bits} bits) into {args.output} "
+          f"in {time.perf_counter() - started:.2f}s")
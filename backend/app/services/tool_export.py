@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator
+
+from bson import ObjectId
+
+# Motor 游标每批取回的文档数，同时也是每次向客户端写出的行数
+EXPORT_BATCH_SIZE = 1000
+
+CSV_FIELDS = [
+    "_id", "name", "description", "url", "category", "subcategory", "tags", "icon",
+    "is_free", "is_featured", "rating", "views", "likes", "is_active", "created_at", "updated_at"
+]
+
+
+def _json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return "|".join(str(v) for v in value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+async def export_ndjson(db) -> AsyncIterator[bytes]:
+    lines = []
+    async for tool in db.tools.find({}).batch_size(EXPORT_BATCH_SIZE):
+        lines.append(json.dumps(tool, default=_json_default, ensure_ascii=False))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def export_csv(db) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    rows = 0
+    async for tool in db.tools.find({}, {field: 1 for field in CSV_FIELDS}).batch_size(EXPORT_BATCH_SIZE):
+        writer.writerow([_csv_value(tool.get(field)) for field in CSV_FIELDS])
+        rows += 1
+        if rows % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def gzip_stream(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip 格式
+    async for chunk in chunks:
+        if (data := compressor.compress(chunk)):
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,156 @@
+"""NDJSON 工具批量导入
+
+每行一个工具 JSON，按 ToolCreate 校验，以 url 为键分块 upsert。
+命令行用法（在 backend 目录下）：
+    python -m app.services.tool_import partner_feed.ndjson
+
+命令行导入不会刷新运行中服务的内存索引，导入后需重启服务或通过 HTTP 接口导入。
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, List
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.models.tool import ToolCreate
+from app.services.rating_stats import load_prior_async
+
+IMPORT_CHUNK_SIZE = 1000
+# 报告中最多保留的错误明细条数，超出部分只计数
+MAX_REPORTED_ERRORS = 1000
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+class ImportReport:
+    def __init__(self):
+        self.lines = 0
+        self.inserted = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors: List[dict] = []
+        self.started = time.perf_counter()
+
+    def error(self, line: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def dict(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "lines": self.lines,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "lines_per_second": round(self.lines / elapsed) if elapsed else 0
+        }
+
+
+async def _write_chunk(db, chunk: dict, report: ImportReport):
+    # chunk: url -> (行号, 显式给出的字段, 缺省字段)，同一块内重复的 url 只保留最后一行
+    line_numbers = [line for line, _, _ in chunk.values()]
+    now = datetime.utcnow()
+    prior_mean = (await load_prior_async(db))["mean"]
+    # url 上有唯一索引，并发导入同一 url 时服务端会把撞键的 upsert 重试为更新，不会产生重复工具
+    # 缺省字段只在新建时写入，避免重复导入把 views/likes 等计数清零；新工具的 bayesian_rating 取先验均值
+    ops = [
+        UpdateOne(
+            {"url": url},
+            {
+                "$set": {**fields, "updated_at": now},
+                "$setOnInsert": {**defaults, "bayesian_rating": prior_mean, "created_at": now}
+            },
+            upsert=True
+        )
+        for url, (_, fields, defaults) in chunk.items()
+    ]
+    try:
+        result = await db.tools.bulk_write(ops, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as exc:
+        details = exc.details
+        for write_error in details.get("writeErrors", []):
+            report.error(line_numbers[write_error["index"]], write_error.get("errmsg", "write error"))
+    report.inserted += details.get("nUpserted", 0)
+    report.updated += details.get("nMatched", 0)
+
+
+async def import_tools(db, lines: AsyncIterable[bytes], chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """流式导入，校验下一块的同时写入上一块，内存占用与文件大小无关"""
+    report = ImportReport()
+    chunk: dict = {}
+    pending = None
+
+    async def submit(chunk: dict):
+        nonlocal pending
+        if pending is not None:
+            await pending
+        pending = asyncio.ensure_future(_write_chunk(db, chunk, report))
+
+    async for raw in lines:
+        report.lines += 1
+        if not raw.strip():
+            continue
+        try:
+            tool = ToolCreate.parse_raw(raw)
+        except ValueError as exc:
+            report.error(report.lines, str(exc))
+            continue
+        fields = tool.dict(exclude_unset=True)
+        defaults = {k: v for k, v in tool.dict().items() if k not in fields}
+        chunk.pop(tool.url, None)
+        chunk[tool.url] = (report.lines, fields, defaults)
+        if len(chunk) >= chunk_size:
+            await submit(chunk)
+            chunk = {}
+
+    if chunk:
+        await submit(chunk)
+    if pending is not None:
+        await pending
+    return report.dict()
+
+
+async def _file_lines(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        for line in f:
+            yield line.rstrip(b"\r\n")
+
+
+async def _main(path: str, chunk_size: int):
+    await connect_to_mongo()
+    try:
+        report = await import_tools(get_database(), _file_lines(path), chunk_size)
+    finally:
+        await close_mongo_connection()
+
+    print(
+        f"lines: {report['lines']}  inserted: {report['inserted']}  updated: {report['updated']}  "
+        f"errors: {report['error_count']}  {report['lines_per_second']} lines/s"
+    )
+    for error in report["errors"]:
+        print(f"  line {error['line']}: {error['error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="从 NDJSON 文件批量导入工具")
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    asyncio.run(_main(args.path, args.chunk_size))
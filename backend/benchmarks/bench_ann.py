@@ -0,0 +1,90 @@
+"""对比相似工具查询的精确计算（稀疏矩阵乘向量）与 LSH 近似检索的召回率和延迟
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_ann --queries 200 --k 10 --tables 8 16 --bits 10 12
+    python -m benchmarks.bench_ann --synthetic 200000   # 不连数据库，生成模拟工具
+
+线上默认精确计算；只有某组参数的 recall@k 达到要求（例如 0.95）时，才按该参数构建索引并设置 TOOL_ANN_ENABLED=1。
+"""
+import argparse
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from app.database import get_sync_database
+from app.services import similarity
+from app.services.ann import LSHIndex
+from app.services.similarity import SimilarityIndex
+
+
+def synthetic_tools(n: int, seed: int = 0):
+    """按主题生成工具：同一主题的工具共享一批词，另混入少量随机词"""
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(max(1000, n // 5))]
+    topics = [rng.sample(words, 60) for _ in range(max(1, n // 100))]
+    for i in range(n):
+        topic = rng.choice(topics)
+        yield {
+            "_id": str(i),
+            "name": " ".join(rng.sample(topic, 3)),
+            "description": " ".join(rng.sample(topic, 10) + rng.sample(words, 5)),
+            "tags": rng.sample(topic, 2)
+        }
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(query) for query in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--tables", type=int, nargs="+", default=[8, 16, 24])
+    parser.add_argument("--bits", type=int, nargs="+", default=[10, 12, 14])
+    parser.add_argument("--synthetic", type=int, help="生成 N 个模拟工具代替数据库中的工具")
+    args = parser.parse_args()
+
+    index = SimilarityIndex()
+    start = time.perf_counter()
+    if args.synthetic:
+        index.build(synthetic_tools(args.synthetic))
+    else:
+        index.build(get_sync_database().tools.find({}, {"name": 1, "description": 1, "tags": 1, "category": 1}))
+    index.matrix
+    print(f"tools: {len(index)}  terms: {len(index.terms)}  tf-idf build: {(time.perf_counter() - start) * 1000:.1f} ms")
+    if len(index) < 2:
+        return
+
+    queries = random.Random(1).sample(index.ids, min(args.queries, len(index)))
+    exact, exact_ms = timed(lambda q: {t for t, _ in index.similar(q, args.k, exact=True)}, queries)
+    print(f"exact:                        {exact_ms:8.3f} ms/query")
+
+    # 基准中总是走近似检索
+    similarity.ANN_MIN_TOOLS = 0
+    for n_tables in args.tables:
+        for n_bits in args.bits:
+            start = time.perf_counter()
+            ann = LSHIndex.build(index.ids, index.matrix, index.terms, n_tables, n_bits)
+            build_ms = (time.perf_counter() - start) * 1000
+            # 与线上一致：保存后以 mmap 方式加载
+            with tempfile.TemporaryDirectory() as path:
+                ann.save(path)
+                index.ann = None
+                index.load_ann(path)
+                candidates = np.mean([len(index.ann.candidate_rows(index.signature(q))) for q in queries])
+                approx, approx_ms = timed(lambda q: {t for t, _ in index.similar(q, args.k)}, queries)
+                index.ann = None
+            recall = np.mean([len(a & e) / len(e) for a, e in zip(approx, exact) if e])
+            print(
+                f"lsh {n_tables:3d} tables x {n_bits:2d} bits: {approx_ms:8.3f} ms/query  "
+                f"recall@{args.k} {recall:.3f}  candidates {candidates:8.0f}  build {build_ms:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""对比 /api/search 分面计数的三种取法：多次独立查询、单次 $facet 聚合、内存位图索引
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_search_facets --runs 50 --is-free true
+"""
+import argparse
+import time
+
+from bson import ObjectId
+
+from app.database import get_sync_database
+from app.services.bitmap_index import BitmapIndex
+
+FACET_TAG_LIMIT = 50
+
+
+def build_facet_stages():
+    return {
+        "category_id": [
+            {"$group": {"_id": "$category_id", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}}
+        ],
+        "tags": [
+            {"$unwind": "$tags"},
+            {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": FACET_TAG_LIMIT}
+        ],
+        "is_free": [
+            {"$group": {"_id": "$is_free", "count": {"$sum": 1}}}
+        ]
+    }
+
+
+def separate_queries(db, search_filter, page_size):
+    total = db.tools.count_documents(search_filter)
+    tools = list(db.tools.find(search_filter).sort("created_at", -1).limit(page_size))
+    stages = build_facet_stages()
+    facets = {
+        name: list(db.tools.aggregate([{"$match": search_filter}] + pipeline))
+        for name, pipeline in stages.items()
+    }
+    return total, tools, facets
+
+
+def single_facet(db, search_filter, page_size):
+    stages = build_facet_stages()
+    stages["total"] = [{"$count": "count"}]
+    stages["tools"] = [{"$sort": {"created_at": -1}}, {"$limit": page_size}]
+    return next(db.tools.aggregate([{"$match": search_filter}, {"$facet": stages}]))
+
+
+def bitmap_facets(db, index, search_filter, page_size):
+    bits = index.match(**search_filter)
+    page_ids = index.select(bits, 0, page_size)
+    tools = list(db.tools.find({"_id": {"$in": [ObjectId(tool_id) for tool_id in page_ids]}}))
+    facets = {
+        "category_id": index.facet_counts(bits, "category_id"),
+        "tags": index.facet_counts(bits, "tags", FACET_TAG_LIMIT),
+        "is_free": index.facet_counts(bits, "is_free")
+    }
+    return index.count(bits), tools, facets
+
+
+def timed(fn, runs):
+    fn()  # 预热
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--category-id")
+    parser.add_argument("--is-free", choices=["true", "false"])
+    args = parser.parse_args()
+
+    search_filter = {}
+    if args.category_id:
+        search_filter["category_id"] = args.category_id
+    if args.is_free:
+        search_filter["is_free"] = args.is_free == "true"
+
+    db = get_sync_database()
+    print(f"tools: {db.tools.estimated_document_count()}  filter: {search_filter}  runs: {args.runs}")
+    separate = timed(lambda: separate_queries(db, search_filter, args.page_size), args.runs)
+    facet = timed(lambda: single_facet(db, search_filter, args.page_size), args.runs)
+
+    index = BitmapIndex()
+    start = time.perf_counter()
+    cursor = db.tools.find({}, {"category_id": 1, "tags": 1, "is_free": 1}).sort([("created_at", 1), ("_id", 1)])
+    for tool in cursor:
+        index.add(tool)
+    build = (time.perf_counter() - start) * 1000
+    bitmap = timed(lambda: bitmap_facets(db, index, search_filter, args.page_size), args.runs)
+
+    print(f"separate queries (5 round trips):       {separate:8.2f} ms/op")
+    print(f"single $facet    (1 round trip):        {facet:8.2f} ms/op  ({separate / facet:.2f}x)")
+    print(f"bitmap index     (1 round trip, page):  {bitmap:8.2f} ms/op  ({separate / bitmap:.2f}x)")
+    print(f"bitmap index build: {build:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from bson import ObjectId
+
+from app.services.item_cf import recommend_for_user
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCollection:
+    def __init__(self, db, docs):
+        self.db = db
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        self.db.find_calls += 1
+        return [doc for doc in self.docs if _matches(doc, query)]
+
+
+class FakeDatabase:
+    """只实现推荐用到的 find，并统计调用次数"""
+
+    def __init__(self, **collections):
+        self.find_calls = 0
+        for name in ("favorites", "ratings", "user_views", "tools", "tool_neighbors"):
+            setattr(self, name, FakeCollection(self, collections.get(name, [])))
+
+
+def make_db(history_length: int) -> FakeDatabase:
+    user_id = "u1"
+    history = [ObjectId() for _ in range(history_length)]
+    candidates = [ObjectId() for _ in range(history_length)]
+    return FakeDatabase(
+        favorites=[{"user_id": user_id, "tool_id": str(tool_id)} for tool_id in history[::3]],
+        ratings=[{"user_id": user_id, "tool_id": str(tool_id)} for tool_id in history[1::3]],
+        user_views=[{"user_id": user_id, "tool_id": str(tool_id)} for tool_id in history[2::3]],
+        tools=[
+            {"_id": tool_id, "related_tools": [{"_id": candidate}]}
+            for tool_id, candidate in zip(history, candidates)
+        ],
+        tool_neighbors=[
+            {"tool_id": str(tool_id), "neighbor_ids": [str(candidates[0])], "scores": [0.5]}
+            for tool_id in history
+        ]
+    )
+
+
+def test_query_count_does_not_grow_with_history():
+    short, long = make_db(3), make_db(300)
+
+    short_result = recommend_for_user(short, "u1", 10)
+    long_result = recommend_for_user(long, "u1", 10)
+
+    assert short.find_calls == long.find_calls == 5
+    assert len(short_result) == 3
+    assert len(long_result) == 10
+
+
+def test_scores_combine_related_tools_and_neighbors():
+    db = make_db(3)
+    top_id, top_score = recommend_for_user(db, "u1", 10)[0]
+
+    # candidates[0] 既是第一个工具的相关工具（1 分），又是三个工具的近邻（各 0.5 分）
+    assert top_id == str(db.tools.docs[0]["related_tools"][0]["_id"])
+    assert top_score == 2.5